@@ -0,0 +1,200 @@
+import mmap
+import os
+
+import numpy as np
+
+from datetime_parsing import SAMPLE_SIZE, DatetimeParser
+from errors_and_warnings import InvalidFile
+from points import get_timestamp
+
+BLOCK_SIZE = 1 << 20
+FIELD_NUMBER = 7
+NEWLINE = ord('\n')
+DELIMITER = ord(';')
+
+
+def get_float_array(value_strings: list) -> tuple:
+    """Convert strings to floats, unconvertible values become NaN.
+
+    Returns the array and a mask of values that could not be converted.
+    """
+    try:
+        values = np.fromiter(
+            map(float, value_strings),
+            dtype=np.float64,
+            count=len(value_strings)
+        )
+        return values, np.zeros(len(values), dtype=bool)
+    except ValueError:
+        pass
+    # a slow pass over the values finds the wrong ones
+    values = np.full(len(value_strings), np.nan)
+    is_wrong = np.zeros(len(value_strings), dtype=bool)
+    for index, value_str in enumerate(value_strings):
+        try:
+            values[index] = float(value_str)
+        except ValueError:
+            is_wrong[index] = True
+    return values, is_wrong
+
+
+def get_timestamp_array(datetime_strings: list, datetime_parser) -> tuple:
+    # sonar rows share few distinct times, each of them is parsed once
+    unique_timestamps = dict.fromkeys(datetime_strings)
+    for datetime_str in unique_timestamps:
+        try:
+            unique_timestamps[datetime_str] = get_timestamp(
+                datetime_parser.parse(datetime_str)
+            )
+        except (ValueError, OverflowError):
+            unique_timestamps[datetime_str] = np.nan
+    timestamps = np.fromiter(
+        map(unique_timestamps.__getitem__, datetime_strings),
+        dtype=np.float64,
+        count=len(datetime_strings)
+    )
+    return timestamps, np.isnan(timestamps)
+
+
+def get_line_shapes(block: bytes) -> tuple:
+    """Return field numbers and lengths of lines in a block.
+
+    The last line of the block has no trailing newline.
+    """
+    block_bytes = np.frombuffer(block, dtype=np.uint8)
+    line_ends = np.append(
+        np.flatnonzero(block_bytes == NEWLINE),
+        len(block_bytes)
+    )
+    delimiter_positions = np.flatnonzero(block_bytes == DELIMITER)
+    # np.diff() has no prepend argument before numpy 1.16
+    delimiter_numbers = np.diff(np.concatenate((
+        [0],
+        np.searchsorted(delimiter_positions, line_ends)
+    )))
+    line_lengths = np.diff(np.concatenate(([-1], line_ends))) - 1
+    return delimiter_numbers + 1, line_lengths
+
+
+def get_file_parts(file_path: str, part_size: int) -> list:
+    """Split a file into byte ranges processed separately.
+
+    A part holds the lines starting inside its range.
+    """
+    file_size = os.path.getsize(file_path)
+    return [
+        (part_start, min(part_start + part_size, file_size))
+        for part_start in range(0, file_size, part_size)
+    ]
+
+
+def iter_file_blocks(file_path: str, block_size: int, file_part=None):
+    """Yield blocks of whole lines of a memory-mapped file.
+
+    Only lines starting inside file_part are read when it is given.
+    """
+    if not os.path.getsize(file_path):
+        return
+    with open(file_path, 'rb') as input_file:
+        with mmap.mmap(
+                input_file.fileno(),
+                0,
+                access=mmap.ACCESS_READ
+        ) as mapped_file:
+            block_start, part_end = file_part or (0, len(mapped_file))
+            if block_start:
+                # the line started before the part belongs to the previous one
+                block_start = mapped_file.find(b'\n', block_start - 1) + 1
+                if not block_start:
+                    return
+            while block_start < part_end:
+                block_end = mapped_file.find(
+                    b'\n',
+                    min(block_start + block_size, part_end) - 1
+                )
+                block_end = (
+                    len(mapped_file) if block_end < 0 else block_end + 1
+                )
+                yield mapped_file[block_start:block_end]
+                block_start = block_end
+
+
+def count_lines(file_path: str, file_part=None) -> int:
+    return sum(
+        block.count(b'\n') + (not block.endswith(b'\n'))
+        for block in iter_file_blocks(file_path, BLOCK_SIZE, file_part)
+    )
+
+
+def iter_bathymetry_blocks(
+        file_path: str,
+        invalid_files_list: list,
+        block_size: int = BLOCK_SIZE,
+        file_part=None
+):
+    """Parse a sonar file or its part into arrays block by block.
+
+    Yields tuples of latitude, longitude, timestamp and depth arrays.
+    Rows without 7 fields, with wrong coordinates or wrong measurement
+    time are reported by their line number and skipped, the rest of the
+    file is still read. Depths with a comma as the decimal mark are
+    accepted, a wrong depth becomes NaN. Fields are not unquoted.
+    Lines of a file part are numbered from the start of the part.
+    """
+    datetime_parser = None
+    first_line_number = 1
+    for block in iter_file_blocks(file_path, block_size, file_part):
+        if block.endswith(b'\n'):
+            block = block[:-1]
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').rstrip(b'\r')
+        block_text = block.decode('utf-8')
+        field_numbers, line_lengths = get_line_shapes(block)
+        is_valid = field_numbers == FIELD_NUMBER
+        # all valid rows have the same field number, so one split of
+        # the block gives every column as a slice of the field list
+        lines = None
+        if is_valid.all():
+            fields = block_text.replace('\n', ';').split(';')
+        else:
+            lines = block_text.split('\n')
+            valid_lines = [
+                line for line, is_valid_line in zip(lines, is_valid.tolist())
+                if is_valid_line
+            ]
+            fields = ';'.join(valid_lines).split(';') if valid_lines else []
+        longitudes, is_wrong_longitude = get_float_array(fields[0::7])
+        latitudes, is_wrong_latitude = get_float_array(fields[1::7])
+        depths, _ = get_float_array(
+            ';'.join(fields[2::7]).replace(',', '.').split(';')
+            if fields else []
+        )
+        if datetime_parser is None:
+            datetime_parser = DatetimeParser(fields[6:7 * SAMPLE_SIZE:7])
+        timestamps, is_wrong_time = get_timestamp_array(
+            fields[6::7],
+            datetime_parser
+        )
+
+        is_valid_row = ~(
+            is_wrong_longitude | is_wrong_latitude | is_wrong_time
+        )
+        is_valid[is_valid] = is_valid_row
+        # empty lines are skipped without a warning
+        invalid_line_indexes = np.flatnonzero(~is_valid & (line_lengths > 0))
+        if len(invalid_line_indexes) and lines is None:
+            lines = block_text.split('\n')
+        for line_index in invalid_line_indexes.tolist():
+            invalid_files_list.append(InvalidFile(
+                file_path,
+                lines[line_index].split(';'),
+                first_line_number + line_index
+            ))
+        first_line_number += len(line_lengths)
+        if is_valid_row.any():
+            yield (
+                latitudes[is_valid_row],
+                longitudes[is_valid_row],
+                timestamps[is_valid_row],
+                depths[is_valid_row]
+            )
@@ -0,0 +1,311 @@
+"""Time every pipeline stage on synthetic surveys of several sizes.
+
+Results are stored as JSON files in benchmarks/results/, a comparison with
+an earlier result file shows speed and memory regressions between versions.
+"""
+import argparse
+from collections import OrderedDict
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPOSITORY_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+import numpy as np  # noqa: E402
+
+from synthetic_survey import generate_survey  # noqa: E402
+from data_processing import (  # noqa: E402
+    get_reference_points,
+    iter_bathymetry_chunks,
+    output_result,
+    prepare_survey_data,
+)
+from input_data_loading import load_input_data  # noqa: E402
+from logger_traces import load_logger_traces  # noqa: E402
+from projection import convert_to_utm  # noqa: E402
+from water_elevation import (  # noqa: E402
+    calculate_bottom_elevations,
+    calculate_water_elevations,
+    calculate_water_elevations_vectorized,
+)
+
+RESULTS_DIRECTORY = os.path.join(REPOSITORY_DIRECTORY, 'benchmarks', 'results')
+REGRESSION_THRESHOLD = 1.2
+DEFAULT_REPEATS = 5
+# stages faster than this are dominated by timer and scheduler noise
+MIN_TIME_GROWTH = 0.01
+
+
+def get_stages(survey_paths: dict, output_directory: str) -> list:
+    state = {}
+
+    def load_logger_data():
+        state['logger_traces'] = load_logger_traces(
+            survey_paths['logger_data_filepath']
+        )
+
+    def prepare_reference_points():
+        input_files_content, _ = load_input_data(
+            OrderedDict([
+                (
+                    'points_along_fairway',
+                    [survey_paths['fairway_points_filepath']]
+                ),
+                (
+                    'logger_coordinates',
+                    [survey_paths['logger_points_filepath']]
+                ),
+            ]),
+            survey_paths['logger_data_filepath']
+        )
+        reference_points, _ = get_reference_points(input_files_content)
+        state['survey_data'] = prepare_survey_data(*reference_points)
+
+    def get_bathymetry_points():
+        chunks = list(
+            iter_bathymetry_chunks(
+                survey_paths['bathymetry_paths'],
+                sys.maxsize,
+                []
+            )
+        )
+        state['columns'] = chunks[0]
+
+    def convert_geocoordinates_to_utm():
+        columns = state['columns']
+        survey_data = state['survey_data']
+        columns.utm_x, columns.utm_y = convert_to_utm(
+            columns.latitude,
+            columns.longitude,
+            survey_data.utm_zone,
+            survey_data.is_northern
+        )
+
+    def get_distance_from_sea():
+        columns = state['columns']
+        columns.distance_from_sea = (
+            state['survey_data'].fairway_index.get_distances_from_sea(
+                columns.utm_x,
+                columns.utm_y
+            )
+        )
+
+    def get_water_elevation():
+        calculate_water_elevations(
+            state['columns'],
+            state['survey_data'].logger_points
+        )
+
+    def get_water_elevation_vectorized():
+        calculate_water_elevations_vectorized(
+            state['columns'],
+            state['survey_data'].logger_points
+        )
+
+    def get_bottom_elevation():
+        calculate_bottom_elevations(state['columns'])
+
+    def write_output():
+        output_result(
+            state['columns'],
+            os.path.join(output_directory, 'output.csv')
+        )
+
+    return [
+        ('load_logger_data', load_logger_data),
+        ('prepare_reference_points', prepare_reference_points),
+        ('get_bathymetry_points', get_bathymetry_points),
+        ('convert_geocoordinates_to_utm', convert_geocoordinates_to_utm),
+        ('get_distance_from_sea', get_distance_from_sea),
+        ('get_water_elevation', get_water_elevation),
+        ('get_water_elevation_vectorized', get_water_elevation_vectorized),
+        ('get_bottom_elevation', get_bottom_elevation),
+        ('output_result', write_output),
+    ]
+
+
+def run_stages(
+        survey_paths: dict,
+        output_directory: str,
+        repeats: int = DEFAULT_REPEATS
+) -> dict:
+    # stages depend on the results of earlier ones, so the whole sequence
+    # is repeated; the fastest run is the least disturbed by other load
+    stage_times = OrderedDict()
+    for _ in range(repeats):
+        for stage_name, stage in get_stages(survey_paths, output_directory):
+            start_time = time.perf_counter()
+            stage()
+            stage_times.setdefault(stage_name, []).append(
+                time.perf_counter() - start_time
+            )
+    stage_results = OrderedDict(
+        (stage_name, {
+            'seconds': min(seconds),
+            'median_seconds': statistics.median(seconds),
+            'repeats': len(seconds),
+        })
+        for stage_name, seconds in stage_times.items()
+    )
+    # tracemalloc slows Python code down too much to time it,
+    # memory is traced in a separate pass
+    for stage_name, stage in get_stages(survey_paths, output_directory):
+        tracemalloc.start()
+        stage()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stage_results[stage_name]['peak_memory_bytes'] = peak_memory
+    return stage_results
+
+
+def get_git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPOSITORY_DIRECTORY,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(
+        sizes: list,
+        loggers: int,
+        fairway_vertices: int,
+        repeats: int = DEFAULT_REPEATS
+) -> dict:
+    results = OrderedDict([
+        ('revision', get_git_revision()),
+        ('created', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('python', platform.python_version()),
+        ('numpy', np.__version__),
+        ('sizes', OrderedDict()),
+    ])
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as survey_directory:
+            survey_paths = generate_survey(
+                survey_directory,
+                sonar_points=size,
+                loggers=loggers,
+                fairway_vertices=fairway_vertices,
+                survey_days=max(1, size / 100000)
+            )
+            stage_results = run_stages(
+                survey_paths,
+                survey_directory,
+                repeats
+            )
+        results['sizes'][str(size)] = stage_results
+        print_size_results(size, stage_results)
+    return results
+
+
+def print_size_results(size: int, stage_results: dict):
+    print('{} sonar points:'.format(size))
+    for stage_name, stage_result in stage_results.items():
+        print(
+            '    {:<32}{:>10.3f} s{:>12.1f} MiB{:>14.0f} points/s'.format(
+                stage_name,
+                stage_result['seconds'],
+                stage_result['peak_memory_bytes'] / 2 ** 20,
+                size / max(stage_result['seconds'], 1e-9)
+            )
+        )
+
+
+def compare_results(results: dict, baseline_results: dict) -> list:
+    regressions = []
+    for size, stage_results in results['sizes'].items():
+        baseline_stages = baseline_results['sizes'].get(size, {})
+        for stage_name, stage_result in stage_results.items():
+            baseline_result = baseline_stages.get(stage_name)
+            if baseline_result is None:
+                continue
+            for measure in ('seconds', 'peak_memory_bytes'):
+                ratio = (
+                    stage_result[measure] / max(baseline_result[measure], 1e-9)
+                )
+                if measure == 'seconds' and (
+                        stage_result[measure] - baseline_result[measure]
+                        < MIN_TIME_GROWTH
+                ):
+                    continue
+                if ratio > REGRESSION_THRESHOLD:
+                    regressions.append(
+                        '{} points, {}: {} grew {:.2f} times'.format(
+                            size,
+                            stage_name,
+                            measure,
+                            ratio
+                        )
+                    )
+    return regressions
+
+
+def get_console_arguments():
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[10000, 100000],
+        help='Enter numbers of sonar points in synthetic surveys.'
+    )
+    argument_parser.add_argument('--loggers', type=int, default=7)
+    argument_parser.add_argument('--fairway_vertices', type=int, default=1000)
+    argument_parser.add_argument(
+        '--repeats',
+        type=int,
+        default=DEFAULT_REPEATS,
+        help='Enter number of timed runs of every stage, the fastest one '
+             'is compared with the baseline.'
+    )
+    argument_parser.add_argument(
+        '--baseline',
+        help='Enter path of an earlier result file to compare with.'
+    )
+    argument_parser.add_argument(
+        '--output',
+        help='Enter path of the result file. By default it is named '
+             'after the current git revision in benchmarks/results/.'
+    )
+    return argument_parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = get_console_arguments()
+    benchmark_results = run_benchmarks(
+        arguments.sizes,
+        arguments.loggers,
+        arguments.fairway_vertices,
+        arguments.repeats
+    )
+    output_path = arguments.output or os.path.join(
+        RESULTS_DIRECTORY,
+        '{}.json'.format(benchmark_results['revision'])
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        json.dump(benchmark_results, output_file, indent=2)
+    print('Results are saved to {}'.format(output_path))
+
+    if arguments.baseline:
+        with open(arguments.baseline, 'r', encoding='utf-8') as baseline_file:
+            regression_list = compare_results(
+                benchmark_results,
+                json.load(baseline_file)
+            )
+        for regression in regression_list:
+            print('REGRESSION! {}'.format(regression))
+        if regression_list:
+            exit(1)
@@ -0,0 +1,207 @@
+"""Generator of synthetic surveys in the script's input file formats."""
+import argparse
+import csv
+from datetime import datetime, timedelta
+import os
+
+import numpy as np
+from openpyxl import Workbook
+
+START_LATITUDE = 63.93
+START_LONGITUDE = 37.98
+FAIRWAY_STEP = 25
+METRES_PER_DEGREE = 111320
+SURVEY_START = datetime(2017, 8, 6)
+TIDE_PERIOD = timedelta(hours=12, minutes=25).total_seconds()
+
+
+def get_fairway(fairway_vertices: int, random_generator) -> tuple:
+    distances = np.arange(1, fairway_vertices + 1) * FAIRWAY_STEP
+    # a meandering line going south-east from the sea
+    headings = np.radians(
+        110 + 20 * np.sin(distances / 3000)
+        + random_generator.normal(0, 2, fairway_vertices)
+    )
+    north_steps = FAIRWAY_STEP * np.cos(headings) / METRES_PER_DEGREE
+    east_steps = FAIRWAY_STEP * np.sin(headings) / (
+        METRES_PER_DEGREE * np.cos(np.radians(START_LATITUDE))
+    )
+    latitudes = START_LATITUDE + np.cumsum(north_steps)
+    longitudes = START_LONGITUDE + np.cumsum(east_steps)
+    return latitudes, longitudes, distances
+
+
+def get_logger_trace(
+        chainage: float,
+        survey_seconds: float,
+        gap_probability: float,
+        random_generator
+) -> tuple:
+    times = np.arange(0, survey_seconds + 3600, 60, dtype=float)
+    # the tide comes later and weaker upstream
+    phase = chainage / 5000
+    elevations = (
+        np.sin(2 * np.pi * times / TIDE_PERIOD - phase)
+        * max(1.5 - chainage / 40000, 0.3)
+        + chainage / 20000
+    )
+    # every hour may be cut by a gap longer than the 15-minute threshold
+    is_kept = np.ones(len(times), dtype=bool)
+    for hour_start in range(0, len(times), 60):
+        if random_generator.random_sample() < gap_probability:
+            gap_length = int(random_generator.randint(16, 120))
+            is_kept[hour_start:hour_start + gap_length] = False
+    return times[is_kept], elevations[is_kept]
+
+
+def write_logger_workbook(file_path: str, logger_traces: dict):
+    workbook = Workbook(write_only=True)
+    for logger_name, (times, elevations) in logger_traces.items():
+        sheet = workbook.create_sheet(logger_name)
+        sheet.append(['Datetime', 'H, m'])
+        for seconds, elevation in zip(times.tolist(), elevations.tolist()):
+            sheet.append([SURVEY_START + timedelta(seconds=seconds), elevation])
+    workbook.save(file_path)
+
+
+def write_sonar_files(
+        directory: str,
+        sonar_points: int,
+        sonar_files: int,
+        fairway: tuple,
+        survey_seconds: float,
+        random_generator
+) -> list:
+    latitudes, longitudes, _ = fairway
+    vertex_indexes = random_generator.randint(0, len(latitudes), sonar_points)
+    point_latitudes = (
+        latitudes[vertex_indexes]
+        + random_generator.normal(0, 50, sonar_points) / METRES_PER_DEGREE
+    )
+    point_longitudes = (
+        longitudes[vertex_indexes]
+        + random_generator.normal(0, 100, sonar_points) / METRES_PER_DEGREE
+    )
+    depths = np.abs(random_generator.normal(4, 2, sonar_points))
+    seconds = np.sort(random_generator.uniform(0, survey_seconds, sonar_points))
+
+    file_paths = []
+    os.makedirs(directory, exist_ok=True)
+    for file_number, point_indexes in enumerate(
+            np.array_split(np.arange(sonar_points), sonar_files)
+    ):
+        file_path = os.path.join(
+            directory,
+            'Sonar{:04d}.csv'.format(file_number)
+        )
+        with open(file_path, 'w', newline='', encoding='utf-8') as sonar_file:
+            writer = csv.writer(sonar_file, delimiter=';')
+            for index in point_indexes.tolist():
+                measurement_datetime = (
+                    SURVEY_START + timedelta(seconds=int(seconds[index]))
+                )
+                writer.writerow([
+                    '{:.14f}'.format(point_longitudes[index]),
+                    '{:.14f}'.format(point_latitudes[index]),
+                    '{:.1f}'.format(depths[index]).replace('.', ','),
+                    index,
+                    0,
+                    '0:00',
+                    measurement_datetime.strftime('%d.%m.%Y %H:%M')
+                ])
+        file_paths.append(file_path)
+    return file_paths
+
+
+def generate_survey(
+        directory: str,
+        sonar_points: int = 10000,
+        sonar_files: int = 4,
+        loggers: int = 7,
+        fairway_vertices: int = 1000,
+        survey_days: float = 3,
+        gap_probability: float = 0.05,
+        seed: int = 0
+) -> dict:
+    random_generator = np.random.RandomState(seed)
+    survey_seconds = survey_days * 24 * 3600
+    fairway = get_fairway(fairway_vertices, random_generator)
+    fairway_latitudes, fairway_longitudes, distances = fairway
+    os.makedirs(directory, exist_ok=True)
+
+    fairway_path = os.path.join(directory, 'fairway_points.csv')
+    with open(fairway_path, 'w', newline='', encoding='utf-8') as fairway_file:
+        writer = csv.writer(fairway_file, delimiter=';')
+        for row in zip(
+                fairway_longitudes.tolist(),
+                fairway_latitudes.tolist(),
+                [1] * fairway_vertices,
+                distances.tolist()
+        ):
+            writer.writerow(row)
+
+    logger_vertices = np.linspace(0, fairway_vertices - 1, loggers).astype(int)
+    logger_points_path = os.path.join(directory, 'logger_points.csv')
+    logger_traces = {}
+    with open(
+            logger_points_path,
+            'w',
+            newline='',
+            encoding='utf-8'
+    ) as logger_file:
+        writer = csv.writer(logger_file, delimiter=';')
+        for logger_number, vertex in enumerate(logger_vertices.tolist()):
+            logger_name = str(logger_number)
+            writer.writerow([
+                fairway_longitudes[vertex],
+                fairway_latitudes[vertex],
+                logger_name
+            ])
+            logger_traces[logger_name] = get_logger_trace(
+                distances[vertex],
+                survey_seconds,
+                gap_probability,
+                random_generator
+            )
+    logger_data_path = os.path.join(directory, 'logger_data.xlsx')
+    write_logger_workbook(logger_data_path, logger_traces)
+
+    bathymetry_directory = os.path.join(directory, 'bathymetry_data')
+    bathymetry_paths = write_sonar_files(
+        bathymetry_directory,
+        sonar_points,
+        sonar_files,
+        fairway,
+        survey_seconds,
+        random_generator
+    )
+    return {
+        'bathymetry_directory': bathymetry_directory,
+        'bathymetry_paths': bathymetry_paths,
+        'fairway_points_filepath': fairway_path,
+        'logger_points_filepath': logger_points_path,
+        'logger_data_filepath': logger_data_path,
+    }
+
+
+def get_console_arguments():
+    argument_parser = argparse.ArgumentParser(
+        description='Generate a synthetic survey.'
+    )
+    argument_parser.add_argument('directory')
+    argument_parser.add_argument('--sonar_points', type=int, default=10000)
+    argument_parser.add_argument('--sonar_files', type=int, default=4)
+    argument_parser.add_argument('--loggers', type=int, default=7)
+    argument_parser.add_argument('--fairway_vertices', type=int, default=1000)
+    argument_parser.add_argument('--survey_days', type=float, default=3)
+    argument_parser.add_argument('--gap_probability', type=float, default=0.05)
+    argument_parser.add_argument('--seed', type=int, default=0)
+    return argument_parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = vars(get_console_arguments())
+    survey_paths = generate_survey(arguments.pop('directory'), **arguments)
+    for name, path in survey_paths.items():
+        if name != 'bathymetry_paths':
+            print('{}: {}'.format(name, path))
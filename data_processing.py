@@ -1,11 +1,32 @@
+from collections import OrderedDict, deque
 import csv
+import heapq
+from itertools import chain, islice
+from multiprocessing import Pool
+from operator import itemgetter
+import os
+import time
 
-from dateutil.parser import parse
+import numpy as np
 
+from bathymetry_csv import count_lines, get_file_parts, iter_bathymetry_blocks
+from diagnostics import DiagnosticsCollector
+from directory_watching import iter_new_files
+from file_manifest import (
+    get_file_key,
+    get_files_to_process,
+    get_manifest,
+    read_manifest,
+    write_manifest,
+)
+from grid_output import ElevationGrid
 from input_data_loading import (
+    get_bathymetry_file_paths,
     get_console_arguments,
     get_input_filenames,
+    load_campaign_inputs,
     load_input_data,
+    read_job_file,
 )
 from errors_and_warnings import (
     InvalidFile,
@@ -13,41 +34,67 @@ from errors_and_warnings import (
     print_about_wrong_file_format,
     print_invalid_points
 )
-from points import BathymetryPoint, FairwayPoint, LoggerPoint
+from point_columns import BathymetryColumns
+from points import FairwayPoint, LoggerPoint
+from profiling import DISABLED_PROFILER, StageProfiler
+from sqlite_output import write_result_database
+from survey_processing import (
+    ProcessingOptions,
+    prepare_survey_data,
+    prepare_water_surface,
+    process_bathymetry_columns,
+)
 
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+# bytes of a sonar file row, parts of files sent to workers hold about
+# a chunk of rows each
+SONAR_ROW_SIZE = 80
+# read-only state of a worker process, set once by init_worker()
+worker_state = {}
 
-def get_bathymetry_points(bathymetry_data: dict) -> tuple:
-    bathymetry_list = []
-    invalid_files_list = []
-    for file, file_content in bathymetry_data.items():
-        for point in file_content:
-            try:
-                long, lat, depth, _, _, _, datetime_str = point
-            except ValueError:
-                invalid_files_list.append(InvalidFile(file, point))
-                break
-            try:
-                depth = float(depth.replace(',', '.'))
-            except ValueError:
-                depth = None
-            try:
-                measurement_datetime = parse(
-                    datetime_str,
-                    dayfirst=True,
-                    yearfirst=False
-                )
-                bathymetry_point = BathymetryPoint(
-                    float(lat),
-                    float(long),
-                    measurement_datetime,
-                    depth,
-                    input_filepath=file
+
+def iter_bathymetry_chunks(
+        file_paths: list,
+        chunk_size: int,
+        invalid_files_list: list,
+        file_part=None
+):
+    # parsed blocks are gathered until they fill a chunk,
+    # chunks may hold points of several files
+    chunk_blocks = []
+    chunk_length = 0
+    for file_id, file_path in enumerate(file_paths):
+        file_blocks = iter_bathymetry_blocks(
+            file_path,
+            invalid_files_list,
+            file_part=file_part
+        )
+        for latitudes, longitudes, timestamps, depths in file_blocks:
+            chunk_blocks.append((
+                latitudes,
+                longitudes,
+                timestamps,
+                depths,
+                np.full(len(latitudes), file_id, dtype=np.int32)
+            ))
+            chunk_length += len(latitudes)
+            while chunk_length >= chunk_size:
+                chunk_columns = [
+                    np.concatenate(column) for column in zip(*chunk_blocks)
+                ]
+                yield BathymetryColumns(
+                    *[column[:chunk_size] for column in chunk_columns],
+                    file_paths
                 )
-            except ValueError:
-                invalid_files_list.append(InvalidFile(file, point))
-                break
-            bathymetry_list.append(bathymetry_point)
-    return bathymetry_list, invalid_files_list
+                chunk_blocks = [
+                    tuple(column[chunk_size:] for column in chunk_columns)
+                ]
+                chunk_length -= chunk_size
+    if chunk_length:
+        yield BathymetryColumns(
+            *[np.concatenate(column) for column in zip(*chunk_blocks)],
+            file_paths
+        )
 
 
 def get_fairway_points(input_fairway_data):
@@ -83,47 +130,206 @@ def get_logger_points(
             except ValueError:
                 invalid_files_list.append(InvalidFile(file_name, point))
                 break
-            logger_data = all_loggers_data[logger_name]
+            logger_trace = all_loggers_data[logger_name]
             logger_point = LoggerPoint(
                 logger_name,
                 float(latitude),
                 float(longitude),
                 input_filepath=file_name,
-                logger_data=logger_data
+                logger_trace=logger_trace
             )
             logger_list.append(logger_point)
     return logger_list, invalid_files_list
 
 
-def get_logger_data(xlsx_workbook):
-    all_loggers_data = {}
-    for sheet in xlsx_workbook:
-        logger_trace = {}
-        for row in sheet.iter_rows(min_row=2, max_col=2):
-            measurement_datetime = row[0].value
-            if measurement_datetime is None:
-                break
-            elevation = row[1].value
-            logger_trace[measurement_datetime] = elevation
-        all_loggers_data[sheet.title] = logger_trace
-    return all_loggers_data
-
-
-def get_data_from_files_content(content):
-    bathymetry_data, fairway_data, loggers, xlsx_file_workbook = content
-    bathymetry_points, invalid_files = get_bathymetry_points(bathymetry_data)
+def get_reference_points(content):
+    fairway_data, loggers, water_elevation_data = content
     fairway_points, invalid_fairway_files = get_fairway_points(fairway_data)
-    water_elevation_data = get_logger_data(xlsx_file_workbook)
     logger_points, invalid_log_files = get_logger_points(
         loggers,
         water_elevation_data
     )
-    input_data = [bathymetry_points, fairway_points, logger_points]
-    invalid_files = invalid_files + invalid_fairway_files + invalid_log_files
-    return input_data, invalid_files
+    invalid_files = invalid_fairway_files + invalid_log_files
+    return [fairway_points, logger_points], invalid_files
 
 
-def output_result(bathymetry_points, output_path):
+def iter_processed_chunks(
+        file_paths: list,
+        survey_data,
+        processing_options,
+        invalid_files_list: list,
+        profiler=DISABLED_PROFILER,
+        file_part=None
+):
+    bathymetry_chunks = iter_bathymetry_chunks(
+        file_paths,
+        processing_options.chunk_size,
+        invalid_files_list,
+        file_part
+    )
+    profiler.start_chunk()
+    for bathymetry_columns in profiler.iter_stage(
+            'read_bathymetry',
+            bathymetry_chunks
+    ):
+        process_bathymetry_columns(
+            bathymetry_columns,
+            survey_data,
+            processing_options,
+            profiler
+        )
+        profiler.add_chunk(bathymetry_columns)
+        yield bathymetry_columns
+        profiler.start_chunk()
+
+
+def init_worker(survey_data, processing_options, profiler_settings):
+    # survey data is passed once per worker process, not once per task
+    worker_state['survey_data'] = survey_data
+    worker_state['processing_options'] = processing_options
+    worker_state['profiler_settings'] = profiler_settings
+
+
+def iter_pool_results(pool, function, tasks, max_pending: int):
+    """Yield results of pool tasks in the order of tasks.
+
+    At most max_pending tasks are submitted ahead of the consumer,
+    so results of finished tasks do not pile up while it writes output.
+    """
+    pending_results = deque()
+    for task in tasks:
+        pending_results.append(pool.apply_async(function, (task,)))
+        if len(pending_results) > max_pending:
+            yield pending_results.popleft().get()
+    while pending_results:
+        yield pending_results.popleft().get()
+
+
+def get_file_part_tasks(file_paths: list, chunk_size: int) -> list:
+    # a worker sends back a part at once, so parts are kept about
+    # as large as a chunk rather than as a whole file
+    part_size = max(chunk_size * SONAR_ROW_SIZE, 1)
+    return [
+        (file_path, file_part)
+        for file_path in file_paths
+        for file_part in get_file_parts(file_path, part_size)
+    ]
+
+
+def process_file_part(task: tuple) -> tuple:
+    file_path, file_part = task
+    invalid_files_list = []
+    # a worker profiles every part separately and sends the profile back
+    profiler = StageProfiler(*worker_state['profiler_settings'])
+    processed_chunks = list(
+        iter_processed_chunks(
+            [file_path],
+            worker_state['survey_data'],
+            worker_state['processing_options'],
+            invalid_files_list,
+            profiler,
+            file_part
+        )
+    )
+    line_number = count_lines(file_path, file_part)
+    return processed_chunks, invalid_files_list, profiler, line_number
+
+
+def set_file_line_numbers(
+        invalid_files: list,
+        file_path: str,
+        part_line_number: int,
+        file_line_numbers: dict
+):
+    """Number invalid rows of a part from the start of its file.
+
+    Parts must come in the order of the file, file_line_numbers keeps
+    the number of lines of every file read so far.
+    """
+    first_line_number = file_line_numbers.get(file_path, 0)
+    for invalid_file in invalid_files:
+        invalid_file.line_number += first_line_number
+    file_line_numbers[file_path] = first_line_number + part_line_number
+
+
+def iter_processed_chunks_in_parallel(
+        file_paths: list,
+        survey_data,
+        processing_options,
+        invalid_files_list: list,
+        profiler=DISABLED_PROFILER
+):
+    with Pool(
+            processing_options.workers,
+            initializer=init_worker,
+            initargs=(
+                survey_data,
+                processing_options,
+                (profiler.enabled, profiler.profiled_stage)
+            )
+    ) as pool:
+        tasks = get_file_part_tasks(file_paths, processing_options.chunk_size)
+        part_results = iter_pool_results(
+            pool,
+            process_file_part,
+            tasks,
+            processing_options.workers
+        )
+        file_line_numbers = {}
+        for (file_path, _), (
+                processed_chunks,
+                invalid_files,
+                part_profiler,
+                line_number
+        ) in zip(tasks, profiler.iter_stage('wait_for_workers', part_results)):
+            set_file_line_numbers(
+                invalid_files,
+                file_path,
+                line_number,
+                file_line_numbers
+            )
+            invalid_files_list.extend(invalid_files)
+            profiler.merge(part_profiler)
+            yield from processed_chunks
+
+
+def init_campaign_worker(
+        survey_data_list: list,
+        processing_options,
+        profiler_settings
+):
+    init_worker(None, processing_options, profiler_settings)
+    worker_state['survey_data_list'] = survey_data_list
+
+
+def process_campaign_file_part(task: tuple) -> tuple:
+    survey_data_id, file_path, file_part = task
+    start_time = time.perf_counter()
+    worker_state['survey_data'] = (
+        worker_state['survey_data_list'][survey_data_id]
+    )
+    part_result = process_file_part((file_path, file_part))
+    return part_result + (time.perf_counter() - start_time,)
+
+
+def get_output_format(output_format: str, output_path: str) -> str:
+    if output_format:
+        return output_format
+    _, file_extension = os.path.splitext(output_path)
+    if file_extension in SQLITE_EXTENSIONS:
+        return 'sqlite'
+    return 'csv'
+
+
+def get_processing_options(console_arguments):
+    return ProcessingOptions(
+        console_arguments.chunk_size,
+        console_arguments.workers,
+        console_arguments.vectorized
+    )
+
+
+def write_result_header(writer):
     column_names = [
         'longitude',
         'latitude',
@@ -136,83 +342,702 @@ def output_result(bathymetry_points, output_path):
         'upper_logger',
         'lower_logger'
     ]
+    writer.writerow(column_names)
+
+
+def write_result_points(writer, bathymetry_points):
+    for point in bathymetry_points:
+        bottom_elevation, water_elevation = None, None
+        upper_logger_name, lower_logger_name = None, None
+
+        if point.bottom_elevation:
+            bottom_elevation = round(point.bottom_elevation, 2)
+
+        if point.water_elevation:
+            water_elevation = round(point.water_elevation, 2)
+
+        if point.upper_logger:
+            upper_logger_name = point.upper_logger.logger_name
+
+        if point.lower_logger:
+            lower_logger_name = point.lower_logger.logger_name
+
+        writer.writerow(
+            [
+                point.longitude,
+                point.latitude,
+                bottom_elevation,
+                point.measurement_datetime,
+                water_elevation,
+                round(point.depth, 2),
+                point.distance_from_sea,
+                point.input_filepath,
+                upper_logger_name,
+                lower_logger_name
+            ]
+        )
+
+
+def round_elevation(elevation: float):
+    # NaN and zero elevations are written as empty values
+    if elevation != elevation or not elevation:
+        return None
+    return round(elevation, 2)
+
+
+def write_result_columns(writer, bathymetry_columns):
+    rows = zip(
+        bathymetry_columns.utm_x.tolist(),
+        bathymetry_columns.utm_y.tolist(),
+        bathymetry_columns.bottom_elevation.tolist(),
+        bathymetry_columns.get_datetimes(),
+        bathymetry_columns.water_elevation.tolist(),
+        bathymetry_columns.depth.tolist(),
+        bathymetry_columns.distance_from_sea.tolist(),
+        bathymetry_columns.file_id.tolist(),
+        bathymetry_columns.upper_logger_id.tolist(),
+        bathymetry_columns.lower_logger_id.tolist()
+    )
+    file_paths = bathymetry_columns.file_paths
+    get_logger_name = bathymetry_columns.get_logger_name
+    writer.writerows(
+        [
+            longitude,
+            latitude,
+            round_elevation(bottom_elevation),
+            measurement_datetime,
+            round_elevation(water_elevation),
+            None if depth != depth else round(depth, 2),
+            distance_from_sea,
+            file_paths[file_id],
+            get_logger_name(upper_logger_id),
+            get_logger_name(lower_logger_id)
+        ]
+        for (
+            longitude,
+            latitude,
+            bottom_elevation,
+            measurement_datetime,
+            water_elevation,
+            depth,
+            distance_from_sea,
+            file_id,
+            upper_logger_id,
+            lower_logger_id
+        ) in rows
+    )
+
+
+def write_result_file(output_path: str, bathymetry_chunks):
     with open(output_path, 'w', newline='', encoding='utf-8') as output_file:
         writer = csv.writer(output_file)
-        writer.writerow(column_names)
-        for point in bathymetry_points:
-            bottom_elevation, water_elevation = None, None
-            upper_logger_name, lower_logger_name = None, None
-
-            if point.bottom_elevation:
-                bottom_elevation = round(point.bottom_elevation, 2)
-
-            if point.water_elevation:
-                water_elevation = round(point.water_elevation, 2)
-
-            if point.upper_logger:
-                upper_logger_name = point.upper_logger.logger_name
-
-            if point.lower_logger:
-                lower_logger_name = point.lower_logger.logger_name
-
-            writer.writerow(
-                [
-                    point.longitude,
-                    point.latitude,
-                    bottom_elevation,
-                    point.measurement_datetime,
-                    water_elevation,
-                    round(point.depth, 2),
-                    point.distance_from_sea,
-                    point.input_filepath,
-                    upper_logger_name,
-                    lower_logger_name
-                ]
+        write_result_header(writer)
+        for bathymetry_columns in bathymetry_chunks:
+            write_result_columns(writer, bathymetry_columns)
+
+
+def iter_result_rows(result_path: str):
+    with open(result_path, 'r', newline='', encoding='utf-8') as result_file:
+        result_reader = csv.reader(result_file)
+        next(result_reader, None)
+        yield from result_reader
+
+
+def merge_result_files(
+        previous_output_path: str,
+        new_output_path: str,
+        merged_output_path: str,
+        stale_file_paths: set
+):
+    filepath_column = 7
+    previous_rows = (
+        row for row in iter_result_rows(previous_output_path)
+        if row[filepath_column] not in stale_file_paths
+    )
+    new_rows = iter_result_rows(new_output_path)
+    with open(
+            merged_output_path,
+            'w',
+            newline='',
+            encoding='utf-8'
+    ) as output_file:
+        writer = csv.writer(output_file)
+        write_result_header(writer)
+        # both files hold rows grouped by sonar file in sorted path order
+        writer.writerows(
+            heapq.merge(
+                previous_rows,
+                new_rows,
+                key=itemgetter(filepath_column)
+            )
+        )
+
+
+def write_processed_chunks(
+        output_path: str,
+        output_format: str,
+        bathymetry_chunks,
+        stale_file_paths: list = None
+):
+    if output_format == 'sqlite':
+        write_result_database(
+            output_path,
+            bathymetry_chunks,
+            stale_file_paths
+        )
+    elif stale_file_paths is None:
+        write_result_file(output_path, bathymetry_chunks)
+    else:
+        # only new and changed files were processed,
+        # their rows replace the stale ones of the previous output
+        new_output_path = output_path + '.new'
+        merged_output_path = output_path + '.tmp'
+        write_result_file(new_output_path, bathymetry_chunks)
+        merge_result_files(
+            output_path,
+            new_output_path,
+            merged_output_path,
+            set(stale_file_paths)
+        )
+        os.replace(merged_output_path, output_path)
+        os.remove(new_output_path)
+
+
+def append_result_file(output_path: str, bathymetry_chunks):
+    is_new_file = (
+        not os.path.exists(output_path) or not os.path.getsize(output_path)
+    )
+    with open(output_path, 'a', newline='', encoding='utf-8') as output_file:
+        writer = csv.writer(output_file)
+        if is_new_file:
+            write_result_header(writer)
+        for bathymetry_columns in bathymetry_chunks:
+            write_result_columns(writer, bathymetry_columns)
+
+
+def watch_bathymetry_directory(
+        console_arguments,
+        survey_data,
+        known_file_paths: set,
+        manifest_path: str = None,
+        manifest: dict = None,
+        elevation_grid=None,
+        profiler=DISABLED_PROFILER
+):
+    """Process new sonar files as they appear until Ctrl+C is pressed.
+
+    The survey data stays in memory, so every file costs only the
+    processing of its own rows. Points of new files are appended to the
+    output in the order the files arrive. The elevation grid, if any,
+    is updated and written again after every file.
+    """
+    output_path = console_arguments.output_filepath
+    output_format = get_output_format(
+        console_arguments.output_format,
+        output_path
+    )
+    # a pool would cost more to start than a single file takes
+    processing_options = get_processing_options(console_arguments)._replace(
+        workers=1
+    )
+    print(
+        'Watching {} for new files. Press Ctrl+C to stop.'.format(
+            console_arguments.bathymetry_directory
+        ),
+        flush=True
+    )
+    new_file_paths = iter_new_files(
+        console_arguments.bathymetry_directory,
+        known_file_paths,
+        console_arguments.poll_interval
+    )
+    try:
+        for file_path in new_file_paths:
+            start_time = time.perf_counter()
+            invalid_files_list = []
+            diagnostics = DiagnosticsCollector(
+                console_arguments.diagnostics_window * 60
+            )
+            bathymetry_chunks = diagnostics.iter_chunks(
+                iter_processed_chunks(
+                    [file_path],
+                    survey_data,
+                    processing_options,
+                    invalid_files_list,
+                    profiler
+                )
+            )
+            if elevation_grid is not None:
+                bathymetry_chunks = profiler.iter_stage(
+                    'grid_output',
+                    elevation_grid.iter_chunks(bathymetry_chunks)
+                )
+            with profiler.stage('write_output'):
+                if output_format == 'sqlite':
+                    write_result_database(
+                        output_path,
+                        bathymetry_chunks,
+                        [file_path]
+                    )
+                else:
+                    append_result_file(output_path, bathymetry_chunks)
+            if elevation_grid is not None:
+                with profiler.stage('grid_output'):
+                    elevation_grid.write(console_arguments.grid_filepath)
+            if manifest is not None:
+                manifest['files'][file_path] = get_file_key(file_path)
+                write_manifest(manifest_path, manifest)
+            diagnostics.print_summary()
+            if invalid_files_list:
+                print_about_wrong_file_format(invalid_files_list)
+            profiler.count('invalid_rows', len(invalid_files_list))
+            # the output of a long-running process may go to a log file
+            print(
+                '{} is processed in {:.2f} s.'.format(
+                    file_path,
+                    time.perf_counter() - start_time
+                ),
+                flush=True
+            )
+    except KeyboardInterrupt:
+        print('Watching is stopped.')
+
+
+def get_campaign_survey_data(
+        campaigns: list,
+        csv_data: dict,
+        logger_traces: dict,
+        water_surface_step: float = None
+) -> tuple:
+    """Prepare survey data once for every set of campaign input files.
+
+    Returns the list of prepared survey data, ids of survey data
+    of campaigns and invalid files. Fairway indexes are shared by
+    surveys with the same fairway and UTM zone.
+    """
+    survey_data_list = []
+    survey_data_ids = OrderedDict()
+    campaign_survey_data_ids = []
+    fairway_indexes = {}
+    invalid_files = []
+    for campaign in campaigns:
+        input_paths = (
+            campaign.fairway_points_filepath,
+            campaign.logger_points_filepath,
+            campaign.logger_data_filepath
+        )
+        if input_paths not in survey_data_ids:
+            reference_points, invalid_reference_files = get_reference_points((
+                {input_paths[0]: csv_data[input_paths[0]]},
+                {input_paths[1]: csv_data[input_paths[1]]},
+                logger_traces[input_paths[2]]
+            ))
+            invalid_files.extend(invalid_reference_files)
+            survey_data = prepare_survey_data(
+                *reference_points,
+                fairway_indexes
             )
+            if water_surface_step is not None:
+                survey_data = prepare_water_surface(
+                    survey_data,
+                    water_surface_step
+                )
+                print(survey_data.water_surface.get_report())
+            survey_data_ids[input_paths] = len(survey_data_list)
+            survey_data_list.append(survey_data)
+        campaign_survey_data_ids.append(survey_data_ids[input_paths])
+    return survey_data_list, campaign_survey_data_ids, invalid_files
+
+
+def iter_campaign_part_results(
+        tasks: list,
+        survey_data_list: list,
+        processing_options,
+        profiler=DISABLED_PROFILER
+):
+    initargs = (
+        survey_data_list,
+        processing_options,
+        (profiler.enabled, profiler.profiled_stage)
+    )
+    if processing_options.workers > 1:
+        # files of all campaigns share one pool, so workers do not
+        # wait for the slowest file of a campaign
+        with Pool(
+                processing_options.workers,
+                initializer=init_campaign_worker,
+                initargs=initargs
+        ) as pool:
+            yield from iter_pool_results(
+                pool,
+                process_campaign_file_part,
+                tasks,
+                processing_options.workers
+            )
+    else:
+        init_campaign_worker(*initargs)
+        yield from map(process_campaign_file_part, tasks)
+
+
+def iter_campaign_chunks(
+        part_results,
+        campaign_tasks: list,
+        invalid_files_list: list,
+        campaign_summary: dict,
+        profiler=DISABLED_PROFILER
+):
+    file_line_numbers = {}
+    for (_, file_path, _), (
+            processed_chunks,
+            invalid_files,
+            part_profiler,
+            line_number,
+            seconds
+    ) in zip(campaign_tasks, islice(part_results, len(campaign_tasks))):
+        set_file_line_numbers(
+            invalid_files,
+            file_path,
+            line_number,
+            file_line_numbers
+        )
+        invalid_files_list.extend(invalid_files)
+        profiler.merge(part_profiler)
+        campaign_summary['processing_seconds'] += seconds
+        for bathymetry_columns in processed_chunks:
+            campaign_summary['rows'] += len(bathymetry_columns)
+            yield bathymetry_columns
+
+
+def print_campaign_summaries(campaign_summaries: list):
+    row_format = '{:<32}{:>8}{:>12}{:>14}{:>14}{:>12}'
+    print('Campaign summary:')
+    print(row_format.format(
+        'campaign',
+        'files',
+        'rows',
+        'invalid rows',
+        'processing s',
+        'total s'
+    ))
+    for campaign_summary in campaign_summaries:
+        print(row_format.format(
+            campaign_summary['name'],
+            campaign_summary['files'],
+            campaign_summary['rows'],
+            campaign_summary['invalid_rows'],
+            '{:.2f}'.format(campaign_summary['processing_seconds']),
+            '{:.2f}'.format(campaign_summary['seconds'])
+        ))
+
+
+def process_campaigns(console_arguments, profiler=DISABLED_PROFILER):
+    """Process every campaign of the job file.
+
+    Fairway, logger and logger data files are read once however many
+    campaigns use them. Sonar files of all campaigns are processed in one
+    pool of workers, the output of every campaign is written as soon as
+    its files are processed.
+    """
+    try:
+        campaigns = read_job_file(
+            console_arguments.job_file,
+            console_arguments
+        )
+    except (OSError, ValueError) as error:
+        print('ERROR! Can not read the job file: {}'.format(error))
+        exit()
+    csv_data, logger_traces, invalid_file_paths = load_campaign_inputs(
+        campaigns,
+        console_arguments.cache_directory,
+        profiler
+    )
+    ready_campaigns = []
+    for campaign in campaigns:
+        missing_file_paths = [
+            file_path for file_path in (
+                campaign.fairway_points_filepath,
+                campaign.logger_points_filepath,
+                campaign.logger_data_filepath
+            )
+            if file_path in invalid_file_paths
+        ]
+        try:
+            bathymetry_file_paths = get_bathymetry_file_paths(
+                campaign.bathymetry_directory
+            )
+        except FileNotFoundError:
+            missing_file_paths.append(campaign.bathymetry_directory)
+        if missing_file_paths:
+            print(
+                'ERROR! Campaign {} is skipped, can not find these files:\n'
+                '{}'.format(campaign.name, '\n'.join(missing_file_paths))
+            )
+            continue
+        ready_campaigns.append((campaign, bathymetry_file_paths))
+
+    with profiler.stage('prepare_survey_data'):
+        survey_data_list, survey_data_ids, invalid_files = (
+            get_campaign_survey_data(
+                [campaign for campaign, _ in ready_campaigns],
+                csv_data,
+                logger_traces,
+                console_arguments.water_surface_step
+            )
+        )
+    if invalid_files:
+        print_about_wrong_file_format(invalid_files)
+    processing_options = get_processing_options(console_arguments)
+    campaign_tasks = [
+        [
+            (survey_data_id, file_path, file_part)
+            for file_path, file_part in get_file_part_tasks(
+                file_paths,
+                processing_options.chunk_size
+            )
+        ]
+        for survey_data_id, (_, file_paths) in zip(
+            survey_data_ids,
+            ready_campaigns
+        )
+    ]
+    part_results = profiler.iter_stage(
+        'wait_for_workers',
+        iter_campaign_part_results(
+            list(chain.from_iterable(campaign_tasks)),
+            survey_data_list,
+            processing_options,
+            profiler
+        )
+    )
+    campaign_summaries = []
+    invalid_row_number = len(invalid_files)
+    for survey_data_id, (campaign, file_paths), tasks in zip(
+            survey_data_ids,
+            ready_campaigns,
+            campaign_tasks
+    ):
+        start_time = time.perf_counter()
+        campaign_summary = OrderedDict([
+            ('name', campaign.name),
+            ('files', len(file_paths)),
+            ('rows', 0),
+            ('invalid_rows', 0),
+            ('processing_seconds', 0.0),
+            ('seconds', 0.0),
+        ])
+        invalid_files_list = []
+        bathymetry_chunks = iter_campaign_chunks(
+            part_results,
+            tasks,
+            invalid_files_list,
+            campaign_summary,
+            profiler
+        )
+        diagnostics = DiagnosticsCollector(
+            console_arguments.diagnostics_window * 60
+        )
+        bathymetry_chunks = profiler.iter_stage(
+            'diagnostics',
+            diagnostics.iter_chunks(bathymetry_chunks)
+        )
+        elevation_grid = None
+        if campaign.grid_filepath:
+            survey_data = survey_data_list[survey_data_id]
+            elevation_grid = ElevationGrid(
+                console_arguments.grid_cell_size,
+                survey_data.utm_zone,
+                survey_data.is_northern
+            )
+            bathymetry_chunks = profiler.iter_stage(
+                'grid_output',
+                elevation_grid.iter_chunks(bathymetry_chunks)
+            )
+        with profiler.stage('write_output'):
+            write_processed_chunks(
+                campaign.output_filepath,
+                get_output_format(
+                    console_arguments.output_format,
+                    campaign.output_filepath
+                ),
+                bathymetry_chunks
+            )
+        if elevation_grid is not None:
+            with profiler.stage('grid_output'):
+                elevation_grid.write(campaign.grid_filepath)
+        campaign_summary['invalid_rows'] = len(invalid_files_list)
+        campaign_summary['seconds'] = time.perf_counter() - start_time
+        campaign_summaries.append(campaign_summary)
+        invalid_row_number += len(invalid_files_list)
+
+        if diagnostics.groups or invalid_files_list:
+            print('Campaign {}:'.format(campaign.name))
+        diagnostics.print_summary()
+        if invalid_files_list:
+            print_about_wrong_file_format(invalid_files_list)
+    profiler.count('invalid_rows', invalid_row_number)
+    print_campaign_summaries(campaign_summaries)
+
+
+def write_profile(console_arguments, profiler):
+    if console_arguments.profile_report:
+        profiler.write_report(console_arguments.profile_report)
+    if console_arguments.profile_dump:
+        profiler.write_profile_dump(console_arguments.profile_dump)
+
+
+def output_result(bathymetry_points, output_path):
+    with open(output_path, 'w', newline='', encoding='utf-8') as output_file:
+        writer = csv.writer(output_file)
+        write_result_header(writer)
+        if isinstance(bathymetry_points, BathymetryColumns):
+            write_result_columns(writer, bathymetry_points)
+        else:
+            write_result_points(writer, bathymetry_points)
 
 
 if __name__ == "__main__":
     console_arguments = get_console_arguments()
+    profiler = DISABLED_PROFILER
+    if console_arguments.profile_report or console_arguments.profile_dump:
+        profiler = StageProfiler(
+            profiled_stage=console_arguments.profile_stage
+            if console_arguments.profile_dump else None
+        )
+    if console_arguments.job_file:
+        process_campaigns(console_arguments, profiler)
+        write_profile(console_arguments, profiler)
+        exit()
     csv_filenames, xlsx_filename = get_input_filenames(console_arguments)
+    bathymetry_file_paths = csv_filenames.pop('bathymetry')
+    known_file_paths = set(bathymetry_file_paths)
     input_files_content, invalid_filepaths = load_input_data(
         csv_filenames,
-        xlsx_filename
+        xlsx_filename,
+        console_arguments.cache_directory,
+        profiler
     )
     if invalid_filepaths:
         print_about_filenotfounderror_and_exit(invalid_filepaths)
 
-    input_data, invalid_files = get_data_from_files_content(input_files_content)
+    reference_points, invalid_files = get_reference_points(input_files_content)
 
     if invalid_files:
         print_about_wrong_file_format(invalid_files)
 
-    bathymetry_points, fairway_points, logger_points = input_data
-    [point.convert_geocoordinates_to_utm() for point in bathymetry_points]
-    [point.convert_geocoordinates_to_utm() for point in fairway_points]
-    [point.convert_geocoordinates_to_utm() for point in logger_points]
-    [point.get_distance_from_sea(fairway_points) for point in bathymetry_points]
-    [point.get_distance_from_sea(fairway_points) for point in logger_points]
-    [point.get_water_elevation(logger_points) for point in bathymetry_points]
-    for point in bathymetry_points:
-        if point.switched_off_loggers:
-            print(
-                """
-                WARNING! These loggers have no data for the point: {}.
-                """.format(point)
-            )
+    output_path = console_arguments.output_filepath
+    stale_file_paths = None
+    manifest_path, manifest = None, None
+    if console_arguments.incremental:
+        manifest_path = output_path + '.manifest.json'
+        previous_manifest = None
+        if os.path.exists(output_path):
+            previous_manifest = read_manifest(manifest_path)
+        dependency_paths = {
+            'fairway_points': console_arguments.fairway_points_filepath,
+            'logger_points': console_arguments.logger_points_filepath,
+            'logger_data': xlsx_filename,
+        }
+        manifest = get_manifest(
+            bathymetry_file_paths,
+            dependency_paths,
+            previous_manifest
+        )
+        bathymetry_file_paths, stale_file_paths = get_files_to_process(
+            manifest,
+            previous_manifest
+        )
+        if stale_file_paths == []:
+            print('The output is up to date.')
+            if not console_arguments.watch:
+                exit()
 
-        if len(point.switched_on_loggers) < 2:
-            print(
-                """
-                WARNING! 
-                Less than 2 loggers were working when depth was measured 
-                at the point: {}.
-                Can not calculate the bottom elevation for this point.
-                """.format(point)
+    with profiler.stage('prepare_survey_data'):
+        survey_data = prepare_survey_data(*reference_points)
+        if console_arguments.water_surface_step is not None:
+            survey_data = prepare_water_surface(
+                survey_data,
+                console_arguments.water_surface_step
+            )
+            print(survey_data.water_surface.get_report())
+    # sonar rows are streamed through the pipeline in bounded chunks,
+    # so memory usage does not depend on the survey size
+    processing_options = get_processing_options(console_arguments)
+    invalid_bathymetry_files = []
+    if processing_options.workers > 1:
+        bathymetry_chunks = iter_processed_chunks_in_parallel(
+            bathymetry_file_paths,
+            survey_data,
+            processing_options,
+            invalid_bathymetry_files,
+            profiler
+        )
+    else:
+        bathymetry_chunks = iter_processed_chunks(
+            bathymetry_file_paths,
+            survey_data,
+            processing_options,
+            invalid_bathymetry_files,
+            profiler
+        )
+    # point problems are summarized once instead of printed point by point
+    diagnostics = DiagnosticsCollector(
+        console_arguments.diagnostics_window * 60,
+        console_arguments.diagnostics_file
+    )
+    bathymetry_chunks = profiler.iter_stage(
+        'diagnostics',
+        diagnostics.iter_chunks(bathymetry_chunks)
+    )
+    elevation_grid = None
+    if console_arguments.grid_filepath:
+        # points are binned as they stream to the output,
+        # the point cloud is not read back
+        elevation_grid = ElevationGrid(
+            console_arguments.grid_cell_size,
+            survey_data.utm_zone,
+            survey_data.is_northern
+        )
+        bathymetry_chunks = profiler.iter_stage(
+            'grid_output',
+            elevation_grid.iter_chunks(bathymetry_chunks)
+        )
+    if stale_file_paths != []:
+        with profiler.stage('write_output'):
+            write_processed_chunks(
+                output_path,
+                get_output_format(
+                    console_arguments.output_format,
+                    output_path
+                ),
+                bathymetry_chunks,
+                stale_file_paths
             )
+    if console_arguments.incremental:
+        write_manifest(manifest_path, manifest)
+    if elevation_grid is not None:
+        with profiler.stage('grid_output'):
+            elevation_grid.write(console_arguments.grid_filepath)
+
+    diagnostics.close()
+    diagnostics.print_summary()
+
+    if invalid_bathymetry_files:
+        print_about_wrong_file_format(invalid_bathymetry_files)
 
-    [point.get_bottom_elevation() for point in bathymetry_points]
-    output_result(
-        bathymetry_points,
-        console_arguments.output_filepath
+    # an invalid sonar file entry is one skipped row, an invalid reference
+    # file entry holds the row that stopped reading the file
+    profiler.count(
+        'invalid_rows',
+        len(invalid_files) + len(invalid_bathymetry_files)
     )
+    if console_arguments.watch:
+        watch_bathymetry_directory(
+            console_arguments,
+            survey_data,
+            known_file_paths,
+            manifest_path,
+            manifest,
+            elevation_grid,
+            profiler
+        )
+    write_profile(console_arguments, profiler)
@@ -0,0 +1,120 @@
+from datetime import datetime
+import re
+
+from dateutil.parser import parse, parserinfo
+
+# layouts tried when sniffing a sonar file; only day-first ones, since
+# dateutil reads an ambiguous year-first date such as 2017-08-05 as May 8
+DATETIME_FORMATS = (
+    '%d.%m.%Y %H:%M',
+    '%d.%m.%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M:%S.%f',
+    '%d.%m.%y %H:%M',
+    '%d.%m.%y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M',
+    '%d-%m-%Y %H:%M:%S',
+)
+DIRECTIVE_PATTERNS = {
+    'd': r'(?P<day>\d{1,2})',
+    'm': r'(?P<month>\d{1,2})',
+    'Y': r'(?P<year>\d{4})',
+    'y': r'(?P<short_year>\d{2})',
+    'H': r'(?P<hour>\d{1,2})',
+    'M': r'(?P<minute>\d{2})',
+    'S': r'(?P<second>\d{2})',
+    'f': r'(?P<microsecond>\d{1,6})',
+}
+SAMPLE_SIZE = 20
+CACHE_SIZE = 10000
+# dateutil's default parser also creates its parserinfo once at import
+PARSER_INFO = parserinfo(dayfirst=True)
+
+
+def compile_datetime_format(datetime_format: str):
+    pattern = re.sub(
+        r'%(\w)|([^%]+)',
+        lambda match: (
+            DIRECTIVE_PATTERNS[match.group(1)] if match.group(1)
+            else re.escape(match.group(2))
+        ),
+        datetime_format
+    )
+    regex = re.compile(r'\s*{}\s*$'.format(pattern))
+
+    def parse_datetime(datetime_str: str):
+        match = regex.match(datetime_str)
+        if match is None:
+            return None
+        values = match.groupdict()
+        if 'short_year' in values:
+            # dateutil puts two-digit years within 50 years of the current one
+            year = PARSER_INFO.convertyear(int(values['short_year']))
+        else:
+            year = int(values['year'])
+        microsecond = values.get('microsecond')
+        try:
+            return datetime(
+                year,
+                int(values['month']),
+                int(values['day']),
+                int(values['hour']),
+                int(values['minute']),
+                int(values.get('second') or 0),
+                int(microsecond.ljust(6, '0')) if microsecond else 0
+            )
+        except ValueError:
+            return None
+
+    return parse_datetime
+
+
+def parse_with_dateutil(datetime_str: str) -> datetime:
+    return parse(datetime_str, dayfirst=True, yearfirst=False)
+
+
+def get_fast_parser(sample_strings: list):
+    expected_datetimes = []
+    for datetime_str in sample_strings:
+        try:
+            expected_datetimes.append(parse_with_dateutil(datetime_str))
+        except (ValueError, OverflowError):
+            return None
+    if not expected_datetimes:
+        return None
+    for datetime_format in DATETIME_FORMATS:
+        fast_parser = compile_datetime_format(datetime_format)
+        parsed_datetimes = [fast_parser(s) for s in sample_strings]
+        # the fast path must agree with dateutil on every sampled row
+        if parsed_datetimes == expected_datetimes:
+            return fast_parser
+    return None
+
+
+class DatetimeParser:
+    """Parses the timestamps of one sonar file.
+
+    The file layout is sniffed from sample rows once, then every row is
+    parsed by a precompiled pattern, falling back to dateutil for rows the
+    pattern does not match. Repeated strings are served from a cache.
+    """
+
+    def __init__(self, sample_strings: list = ()):
+        self.fast_parser = get_fast_parser(list(sample_strings))
+        self.cache = {}
+
+    def parse(self, datetime_str: str) -> datetime:
+        try:
+            return self.cache[datetime_str]
+        except KeyError:
+            pass
+        measurement_datetime = None
+        if self.fast_parser is not None:
+            measurement_datetime = self.fast_parser(datetime_str)
+        if measurement_datetime is None:
+            measurement_datetime = parse_with_dateutil(datetime_str)
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[datetime_str] = measurement_datetime
+        return measurement_datetime
@@ -0,0 +1,190 @@
+from collections import OrderedDict
+import csv
+from datetime import timedelta
+
+import numpy as np
+
+from points import EPOCH
+
+SWITCHED_OFF_LOGGER = 'switched_off_logger'
+TOO_FEW_LOGGERS = 'too_few_loggers'
+POINT_FILE_COLUMNS = [
+    'longitude',
+    'latitude',
+    'time',
+    'filepath',
+    'working_loggers',
+    'switched_off_loggers'
+]
+
+
+def get_datetime(timestamp: float):
+    return EPOCH + timedelta(seconds=timestamp)
+
+
+class DiagnosticsCollector:
+    """Problems of processed sonar points grouped by logger and time window.
+
+    For every group only the point number and the first and the last
+    measurement times are kept, so memory does not grow with the number
+    of affected points. When a per-point file is given, affected points
+    of every chunk are written to it as soon as the chunk is added.
+    """
+
+    def __init__(self, window_seconds: float = 3600, point_file_path=None):
+        self.window_seconds = window_seconds
+        # (problem, logger name) -> {window number: [count, first, last]}
+        self.groups = OrderedDict()
+        self.point_file = None
+        self.point_writer = None
+        if point_file_path:
+            self.point_file = open(
+                point_file_path,
+                'w',
+                newline='',
+                encoding='utf-8'
+            )
+            self.point_writer = csv.writer(self.point_file)
+            self.point_writer.writerow(POINT_FILE_COLUMNS)
+
+    def add_group_points(self, problem: str, logger_name, timestamps):
+        if not len(timestamps):
+            return
+        timestamps = np.sort(timestamps)
+        window_numbers = np.floor(
+            timestamps / self.window_seconds
+        ).astype(np.int64)
+        # timestamps are sorted, so are window numbers
+        window_numbers, first_indexes, counts = np.unique(
+            window_numbers,
+            return_index=True,
+            return_counts=True
+        )
+        last_indexes = first_indexes + counts - 1
+        windows = self.groups.setdefault((problem, logger_name), {})
+        for window_number, count, first_time, last_time in zip(
+                window_numbers.tolist(),
+                counts.tolist(),
+                timestamps[first_indexes].tolist(),
+                timestamps[last_indexes].tolist()
+        ):
+            window = windows.get(window_number)
+            if window is None:
+                windows[window_number] = [count, first_time, last_time]
+            else:
+                window[0] += count
+                window[1] = min(window[1], first_time)
+                window[2] = max(window[2], last_time)
+
+    def add_chunk(self, bathymetry_columns):
+        logger_number = len(bathymetry_columns.logger_names)
+        working_logger_numbers = (
+            bathymetry_columns.get_working_logger_numbers()
+        )
+        is_affected = working_logger_numbers < logger_number
+        if not is_affected.any():
+            return
+        for logger_id, logger_name in enumerate(
+                bathymetry_columns.logger_names
+        ):
+            is_switched_off = (
+                bathymetry_columns.working_logger_mask
+                >> np.uint64(logger_id) & np.uint64(1)
+            ) == 0
+            self.add_group_points(
+                SWITCHED_OFF_LOGGER,
+                logger_name,
+                bathymetry_columns.timestamp[is_switched_off]
+            )
+        self.add_group_points(
+            TOO_FEW_LOGGERS,
+            None,
+            bathymetry_columns.timestamp[working_logger_numbers < 2]
+        )
+        if self.point_writer is not None:
+            self.write_points(
+                bathymetry_columns,
+                is_affected,
+                working_logger_numbers
+            )
+
+    def iter_chunks(self, bathymetry_chunks):
+        for bathymetry_columns in bathymetry_chunks:
+            self.add_chunk(bathymetry_columns)
+            yield bathymetry_columns
+
+    def get_group_lines(self, problem: str) -> list:
+        lines = []
+        for (group_problem, logger_name), windows in self.groups.items():
+            if group_problem != problem:
+                continue
+            for window_number, (count, first_time, last_time) in sorted(
+                    windows.items()
+            ):
+                lines.append(
+                    '    {}{} points measured from {} to {}'.format(
+                        '' if logger_name is None
+                        else 'logger {}: '.format(logger_name),
+                        count,
+                        get_datetime(first_time),
+                        get_datetime(last_time)
+                    )
+                )
+        return lines
+
+    def print_summary(self):
+        switched_off_lines = self.get_group_lines(SWITCHED_OFF_LOGGER)
+        if switched_off_lines:
+            print('WARNING! These loggers have no data for some points:')
+            print('\n'.join(switched_off_lines))
+        too_few_lines = self.get_group_lines(TOO_FEW_LOGGERS)
+        if too_few_lines:
+            print(
+                'WARNING! Less than 2 loggers were working when depth was '
+                'measured at some points.\n'
+                'Can not calculate the bottom elevation for these points:'
+            )
+            print('\n'.join(too_few_lines))
+
+    def write_points(
+            self,
+            bathymetry_columns,
+            is_affected: np.ndarray,
+            working_logger_numbers: np.ndarray
+    ):
+        # points share a few masks, names are joined once per mask
+        masks, mask_indexes = np.unique(
+            bathymetry_columns.working_logger_mask[is_affected],
+            return_inverse=True
+        )
+        switched_off_names = [
+            ' '.join(
+                logger_name
+                for logger_id, logger_name in enumerate(
+                    bathymetry_columns.logger_names
+                )
+                if not mask >> logger_id & 1
+            )
+            for mask in masks.tolist()
+        ]
+        self.point_writer.writerows(zip(
+            bathymetry_columns.utm_x[is_affected].tolist(),
+            bathymetry_columns.utm_y[is_affected].tolist(),
+            [
+                get_datetime(timestamp) for timestamp in
+                bathymetry_columns.timestamp[is_affected].tolist()
+            ],
+            [
+                bathymetry_columns.file_paths[file_id] for file_id in
+                bathymetry_columns.file_id[is_affected].tolist()
+            ],
+            working_logger_numbers[is_affected].tolist(),
+            [
+                switched_off_names[mask_index]
+                for mask_index in mask_indexes.ravel().tolist()
+            ]
+        ))
+
+    def close(self):
+        if self.point_file is not None:
+            self.point_file.close()
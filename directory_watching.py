@@ -0,0 +1,40 @@
+import os
+import time
+
+from input_data_loading import get_bathymetry_file_paths
+
+
+def get_file_state(file_path: str) -> tuple:
+    file_stat = os.stat(file_path)
+    return file_stat.st_size, file_stat.st_mtime_ns
+
+
+def iter_new_files(
+        directory_path: str,
+        known_file_paths: set,
+        poll_interval: float
+):
+    """Poll a directory and yield paths of new *.csv files forever.
+
+    A new file is yielded once its size and modification time are the
+    same in two polls in a row, so files still being copied are not read.
+    Yielded paths are added to known_file_paths.
+    """
+    file_states = {}
+    while True:
+        time.sleep(poll_interval)
+        for file_path in get_bathymetry_file_paths(directory_path):
+            if file_path in known_file_paths:
+                continue
+            try:
+                file_state = get_file_state(file_path)
+            except FileNotFoundError:
+                # the file was removed after the directory was listed
+                file_states.pop(file_path, None)
+                continue
+            if file_states.get(file_path) != file_state:
+                file_states[file_path] = file_state
+                continue
+            del file_states[file_path]
+            known_file_paths.add(file_path)
+            yield file_path
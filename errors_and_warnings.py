@@ -2,11 +2,18 @@ import pprint
 
 
 class InvalidFile:
-    def __init__(self, filename: str, invalid_row: ''):
+    def __init__(self, filename: str, invalid_row: '', line_number=None):
         self.filename = filename
         self.invalid_row = invalid_row
+        self.line_number = line_number
 
     def __str__(self):
+        if self.line_number is not None:
+            return 'Invalid file: {}. Invalid row {}: {}'.format(
+                self.filename,
+                self.line_number,
+                self.invalid_row
+            )
         return 'Invalid file: {}. Invalid row: {}'.format(
             self.filename,
             self.invalid_row
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FORMAT_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_file_hash(file_path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_file_key(file_path: str, previous_key: dict = None) -> dict:
+    file_stat = os.stat(file_path)
+    file_key = {
+        'path': os.path.abspath(file_path),
+        'size': file_stat.st_size,
+        'mtime': file_stat.st_mtime_ns,
+    }
+    # an unchanged size and mtime means the file was not rewritten,
+    # so the previously computed hash is reused
+    if previous_key and all(
+            previous_key.get(name) == value
+            for name, value in file_key.items()
+    ):
+        file_key['sha256'] = previous_key['sha256']
+    else:
+        file_key['sha256'] = get_file_hash(file_path)
+    return file_key
+
+
+def is_same_content(file_key: dict, previous_key: dict) -> bool:
+    if previous_key is None:
+        return False
+    return (
+        file_key['size'] == previous_key['size']
+        and file_key['sha256'] == previous_key['sha256']
+    )
+
+
+def read_manifest(manifest_path: str):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(manifest_path: str, manifest: dict):
+    temporary_path = manifest_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+
+
+def get_manifest(
+        bathymetry_file_paths: list,
+        dependency_paths: dict,
+        previous_manifest: dict = None
+) -> dict:
+    previous_manifest = previous_manifest or {}
+    previous_files = previous_manifest.get('files', {})
+    previous_dependencies = previous_manifest.get('dependencies', {})
+    return {
+        'version': MANIFEST_FORMAT_VERSION,
+        'dependencies': {
+            name: get_file_key(path, previous_dependencies.get(name))
+            for name, path in dependency_paths.items()
+        },
+        'files': {
+            path: get_file_key(path, previous_files.get(path))
+            for path in bathymetry_file_paths
+        },
+    }
+
+
+def get_files_to_process(manifest: dict, previous_manifest: dict) -> tuple:
+    """Return sonar files to process and files whose old rows are stale.
+
+    None instead of the stale file list means that the fairway or logger
+    data changed and the whole output has to be recomputed.
+    """
+    if previous_manifest is None:
+        return list(manifest['files']), None
+    previous_dependencies = previous_manifest['dependencies']
+    for name, dependency_key in manifest['dependencies'].items():
+        if not is_same_content(dependency_key, previous_dependencies.get(name)):
+            return list(manifest['files']), None
+
+    previous_files = previous_manifest['files']
+    changed_files = [
+        path for path, file_key in manifest['files'].items()
+        if not is_same_content(file_key, previous_files.get(path))
+    ]
+    removed_files = [
+        path for path in previous_files if path not in manifest['files']
+    ]
+    return changed_files, changed_files + removed_files
@@ -0,0 +1,225 @@
+import numpy as np
+
+# the grid is stored in square tiles of this number of cells per side,
+# only tiles with points are allocated
+TILE_SIZE = 64
+# a grid with more cells in the bounding box of its points, e.g. because
+# of a stray fix far from the survey, is written as a list of cells
+MAX_RASTER_CELLS = 2 ** 22
+
+
+class GridTile:
+    def __init__(self):
+        shape = (TILE_SIZE, TILE_SIZE)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.sums = np.zeros(shape)
+        self.minimums = np.full(shape, np.inf)
+        self.maximums = np.full(shape, -np.inf)
+
+    def add_points(self, cell_indexes, elevations):
+        cell_number = self.counts.size
+        self.counts += np.bincount(
+            cell_indexes,
+            minlength=cell_number
+        ).reshape(self.counts.shape)
+        self.sums += np.bincount(
+            cell_indexes,
+            weights=elevations,
+            minlength=cell_number
+        ).reshape(self.sums.shape)
+        np.minimum.at(self.minimums.ravel(), cell_indexes, elevations)
+        np.maximum.at(self.maximums.ravel(), cell_indexes, elevations)
+
+    def get_statistics(self) -> tuple:
+        """Return counts, means, minimums and maximums of tile cells.
+
+        Cells without points have NaN statistics.
+        """
+        is_empty = self.counts == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sums / self.counts
+        means[is_empty] = np.nan
+        minimums = np.where(is_empty, np.nan, self.minimums)
+        maximums = np.where(is_empty, np.nan, self.maximums)
+        return self.counts, means, minimums, maximums
+
+
+class ElevationGrid:
+    """Count, mean, minimum and maximum bottom elevation in UTM grid cells.
+
+    Chunks of processed points are added one by one and only tiles of
+    cells with points are kept, so memory depends on the area covered by
+    the survey, not on the number of points or on the distance between
+    them. Cell (row, column) covers UTM coordinates from
+    column * cell_size and row * cell_size.
+    """
+
+    def __init__(self, cell_size: float, utm_zone=None, is_northern=None):
+        if cell_size <= 0:
+            raise ValueError('Cell size must be positive.')
+        self.cell_size = float(cell_size)
+        self.utm_zone = utm_zone
+        self.is_northern = is_northern
+        # tiles by (tile row, tile column) counted from the UTM origin
+        self.tiles = {}
+
+    def add_points(self, utm_x, utm_y, elevations):
+        is_valid = np.isfinite(elevations) & np.isfinite(utm_x) & (
+            np.isfinite(utm_y)
+        )
+        if not is_valid.any():
+            return
+        elevations = elevations[is_valid]
+        rows = np.floor(utm_y[is_valid] / self.cell_size).astype(np.int64)
+        columns = np.floor(utm_x[is_valid] / self.cell_size).astype(np.int64)
+        tile_rows, tile_columns = rows // TILE_SIZE, columns // TILE_SIZE
+        cell_indexes = (
+            (rows - tile_rows * TILE_SIZE) * TILE_SIZE
+            + columns - tile_columns * TILE_SIZE
+        )
+        tile_keys, tile_ids = np.unique(
+            np.stack((tile_rows, tile_columns), axis=1),
+            axis=0,
+            return_inverse=True
+        )
+        point_order = np.argsort(tile_ids.ravel(), kind='stable')
+        tile_ends = np.cumsum(np.bincount(tile_ids.ravel()))
+        tile_start = 0
+        for (tile_row, tile_column), tile_end in zip(
+                tile_keys.tolist(),
+                tile_ends.tolist()
+        ):
+            tile_points = point_order[tile_start:tile_end]
+            tile_start = tile_end
+            tile = self.tiles.get((tile_row, tile_column))
+            if tile is None:
+                tile = self.tiles[tile_row, tile_column] = GridTile()
+            tile.add_points(
+                cell_indexes[tile_points],
+                elevations[tile_points]
+            )
+
+    def add_chunk(self, bathymetry_columns):
+        self.add_points(
+            bathymetry_columns.utm_x,
+            bathymetry_columns.utm_y,
+            bathymetry_columns.bottom_elevation
+        )
+
+    def iter_chunks(self, bathymetry_chunks):
+        for bathymetry_columns in bathymetry_chunks:
+            self.add_chunk(bathymetry_columns)
+            yield bathymetry_columns
+
+    def get_cell_extent(self) -> tuple:
+        """Return the first row, first column, row and column numbers
+        of cells with points."""
+        row_limits, column_limits = [], []
+        for (tile_row, tile_column), tile in self.tiles.items():
+            row_numbers = np.flatnonzero(tile.counts.any(axis=1))
+            column_numbers = np.flatnonzero(tile.counts.any(axis=0))
+            row_limits.extend(
+                (tile_row * TILE_SIZE + row_numbers[[0, -1]]).tolist()
+            )
+            column_limits.extend(
+                (tile_column * TILE_SIZE + column_numbers[[0, -1]]).tolist()
+            )
+        if not row_limits:
+            return 0, 0, 0, 0
+        first_row, first_column = min(row_limits), min(column_limits)
+        return (
+            first_row,
+            first_column,
+            max(row_limits) - first_row + 1,
+            max(column_limits) - first_column + 1
+        )
+
+    def get_raster(self, first_row, first_column, row_number, column_number):
+        shape = (row_number, column_number)
+        raster = [
+            np.zeros(shape, dtype=np.uint32),
+            np.full(shape, np.nan, dtype=np.float32),
+            np.full(shape, np.nan, dtype=np.float32),
+            np.full(shape, np.nan, dtype=np.float32),
+        ]
+        for (tile_row, tile_column), tile in self.tiles.items():
+            # the tile part inside the raster, tiles may stick out of it
+            row_start = tile_row * TILE_SIZE - first_row
+            column_start = tile_column * TILE_SIZE - first_column
+            tile_crop = (
+                slice(max(-row_start, 0),
+                      min(row_number - row_start, TILE_SIZE)),
+                slice(max(-column_start, 0),
+                      min(column_number - column_start, TILE_SIZE))
+            )
+            raster_crop = (
+                slice(row_start + tile_crop[0].start,
+                      row_start + tile_crop[0].stop),
+                slice(column_start + tile_crop[1].start,
+                      column_start + tile_crop[1].stop)
+            )
+            for array, tile_array in zip(raster, tile.get_statistics()):
+                array[raster_crop] = tile_array[tile_crop]
+        return raster
+
+    def get_cells(self, first_row, first_column):
+        rows, columns, statistics = [], [], []
+        for (tile_row, tile_column), tile in self.tiles.items():
+            tile_rows, tile_columns = np.nonzero(tile.counts)
+            rows.append(tile_row * TILE_SIZE + tile_rows - first_row)
+            columns.append(
+                tile_column * TILE_SIZE + tile_columns - first_column
+            )
+            statistics.append([
+                tile_array[tile_rows, tile_columns]
+                for tile_array in tile.get_statistics()
+            ])
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+        cell_order = np.lexsort((columns, rows))
+        cells = [
+            np.concatenate(tile_arrays)[cell_order].astype(dtype)
+            for tile_arrays, dtype in zip(
+                zip(*statistics),
+                (np.uint32, np.float32, np.float32, np.float32)
+            )
+        ]
+        return rows[cell_order], columns[cell_order], cells
+
+    def get_arrays(self) -> dict:
+        """Return grid arrays cropped to cells with points.
+
+        Cells without points have zero count and NaN statistics. A grid
+        with more than MAX_RASTER_CELLS cells holds only cells with points,
+        arrays row and column give their indexes.
+        """
+        first_row, first_column, row_number, column_number = (
+            self.get_cell_extent()
+        )
+        arrays = {}
+        if row_number * column_number <= MAX_RASTER_CELLS:
+            statistics = self.get_raster(
+                first_row,
+                first_column,
+                row_number,
+                column_number
+            )
+        else:
+            arrays['row'], arrays['column'], statistics = self.get_cells(
+                first_row,
+                first_column
+            )
+        arrays.update(zip(('count', 'mean', 'min', 'max'), statistics))
+        arrays.update({
+            'x_min': np.float64(first_column * self.cell_size),
+            'y_min': np.float64(first_row * self.cell_size),
+            'cell_size': np.float64(self.cell_size),
+            'utm_zone': np.int64(
+                -1 if self.utm_zone is None else self.utm_zone
+            ),
+            'is_northern': np.bool_(bool(self.is_northern)),
+        })
+        return arrays
+
+    def write(self, output_path: str):
+        with open(output_path, 'wb') as output_file:
+            np.savez_compressed(output_file, **self.get_arrays())
@@ -1,9 +1,32 @@
 import argparse
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
 import os
 import csv
 
-from openpyxl import load_workbook
+from logger_traces import start_loading_logger_traces
+from profiling import DISABLED_PROFILER, STAGE_NAMES
+
+Campaign = namedtuple(
+    'Campaign',
+    [
+        'name',
+        'bathymetry_directory',
+        'fairway_points_filepath',
+        'logger_points_filepath',
+        'logger_data_filepath',
+        'output_filepath',
+        'grid_filepath',
+    ]
+)
+# options that only apply to a single output
+SINGLE_RUN_OPTIONS = (
+    'incremental',
+    'watch',
+    'grid_filepath',
+    'diagnostics_file',
+)
 
 
 def get_console_arguments():
@@ -41,7 +64,135 @@ def get_console_arguments():
         default='output.csv',
         help='Enter path of *.csv file containing the script`s output.'
     )
+    argument_parser.add_argument(
+        '--output_format',
+        choices=['csv', 'sqlite'],
+        help='Enter format of the script`s output. By default it is '
+             'sqlite for *.db, *.sqlite and *.sqlite3 files, otherwise csv.'
+    )
+    argument_parser.add_argument(
+        '-c',
+        '--chunk_size',
+        default=10000,
+        type=int,
+        help='Enter number of sonar points processed at once. '
+             'Memory usage grows with this number.'
+    )
+    argument_parser.add_argument(
+        '-w',
+        '--workers',
+        default=1,
+        type=int,
+        help='Enter number of processes handling sonar files in parallel.'
+    )
+    argument_parser.add_argument(
+        '--vectorized',
+        action='store_true',
+        help='Calculate water elevations for whole chunks of sonar points '
+             'with array operations.'
+    )
+    argument_parser.add_argument(
+        '--job_file',
+        help='Enter path of *.json file listing survey campaigns to '
+             'process in one run. Input files shared by campaigns are '
+             'read once.'
+    )
+    argument_parser.add_argument(
+        '--water_surface_step',
+        type=float,
+        help='Enter time step in seconds of a water surface table. '
+             'Water elevations are looked up in the table instead of '
+             'being calculated for every sonar point.'
+    )
+    argument_parser.add_argument(
+        '--cache_directory',
+        default='.bathymetry_cache/',
+        help='Enter path of directory caching parsed *.xlsx logger data. '
+             'Enter an empty string to disable the cache.'
+    )
+    argument_parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Process only new and changed *.csv files with bathymetry data '
+             'and merge their points into the existing output.'
+    )
+    argument_parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running after processing, watch the bathymetry directory '
+             'and append points of every new *.csv file to the output.'
+    )
+    argument_parser.add_argument(
+        '--poll_interval',
+        default=5,
+        type=float,
+        help='Enter number of seconds between checks of the bathymetry '
+             'directory in the watch mode.'
+    )
+    argument_parser.add_argument(
+        '--diagnostics_window',
+        default=60,
+        type=float,
+        help='Enter length of time windows in minutes which warnings '
+             'about switched-off loggers are grouped by.'
+    )
+    argument_parser.add_argument(
+        '--diagnostics_file',
+        help='Enter path of *.csv file to write every point '
+             'with switched-off loggers to.'
+    )
+    argument_parser.add_argument(
+        '--grid_filepath',
+        help='Enter path of *.npz file to write a grid of bottom elevations '
+             'to: point count, mean, minimum and maximum of every cell.'
+    )
+    argument_parser.add_argument(
+        '--grid_cell_size',
+        default=10,
+        type=float,
+        help='Enter size of grid cells in metres.'
+    )
+    argument_parser.add_argument(
+        '--profile_report',
+        '--profile-report',
+        help='Enter path of *.json file to write time of every processing '
+             'stage, rows per second of every file, peak memory usage '
+             'and counters of rows, point-logger pairs and invalid rows to.'
+    )
+    argument_parser.add_argument(
+        '--profile_dump',
+        help='Enter path of a file to write cProfile statistics '
+             'of the stage chosen with --profile_stage to.'
+    )
+    argument_parser.add_argument(
+        '--profile_stage',
+        default='water_elevation',
+        choices=STAGE_NAMES,
+        help='Enter name of the stage profiled with cProfile.'
+    )
     arguments = argument_parser.parse_args()
+    if arguments.job_file:
+        for option in SINGLE_RUN_OPTIONS:
+            if getattr(arguments, option):
+                argument_parser.error(
+                    '--{} can not be used with --job_file'.format(option)
+                )
+    if arguments.grid_filepath and arguments.incremental:
+        # unchanged files are not processed again, so their points
+        # would be missing from the grid
+        argument_parser.error(
+            '--grid_filepath can not be used with --incremental'
+        )
+    if arguments.water_surface_step is not None and (
+            arguments.water_surface_step <= 0
+    ):
+        argument_parser.error('--water_surface_step must be positive')
+    if arguments.grid_cell_size <= 0:
+        argument_parser.error('--grid_cell_size must be positive')
+    if arguments.chunk_size <= 0:
+        argument_parser.error('--chunk_size must be positive')
+    if arguments.workers < 1:
+        argument_parser.error('--workers must be at least 1')
     return arguments
 
 
@@ -51,7 +202,53 @@ def get_bathymetry_file_paths(directory_path):
         file_root, file_extension = os.path.splitext(entry.path)
         if file_extension == '.csv':
             filename_list.append(entry.path)
-    return filename_list
+    # sorted paths keep the output order the same from run to run
+    return sorted(filename_list)
+
+
+def read_job_file(job_file_path: str, script_arguments) -> list:
+    """Read campaigns from a job file.
+
+    The file holds a JSON list of objects with paths of a campaign,
+    keys are names of the script parameters. Input paths missing in a
+    campaign are taken from the script parameters, output_filepath
+    is required.
+    """
+    with open(job_file_path, 'r', encoding='utf-8') as job_file:
+        jobs = json.load(job_file)
+    if not isinstance(jobs, list):
+        raise ValueError('The job file must hold a list of campaigns.')
+    if not jobs:
+        raise ValueError('The job file holds no campaigns.')
+    campaigns = []
+    for job_number, job in enumerate(jobs, start=1):
+        if not isinstance(job, dict) or 'output_filepath' not in job:
+            raise ValueError(
+                'Campaign {} has no output_filepath.'.format(job_number)
+            )
+        unknown_keys = set(job) - set(Campaign._fields)
+        if unknown_keys:
+            raise ValueError(
+                'Campaign {} has unknown keys: {}.'.format(
+                    job_number,
+                    ', '.join(sorted(unknown_keys))
+                )
+            )
+        campaign_paths = {
+            field: job.get(field, getattr(script_arguments, field, None))
+            for field in Campaign._fields
+        }
+        campaign_paths['name'] = job.get('name', job['output_filepath'])
+        campaign_paths['grid_filepath'] = job.get('grid_filepath')
+        campaigns.append(Campaign(**campaign_paths))
+    # different spellings of one path are the same output
+    output_paths = [
+        os.path.normcase(os.path.abspath(campaign.output_filepath))
+        for campaign in campaigns
+    ]
+    if len(set(output_paths)) < len(output_paths):
+        raise ValueError('Campaigns must have different output files.')
+    return campaigns
 
 
 def get_input_filenames(script_arguments):
@@ -84,16 +281,119 @@ def load_csv_data(file_name_list):
     return csv_data, invalid_filepaths
 
 
-def load_input_data(csv_file_names, xlsx_file_name):
+def load_input_files(
+        csv_file_names,
+        xlsx_file_name,
+        cache_directory,
+        process_pool,
+        profiler
+):
     input_files_content = []
     invalid_file_paths = []
-    for file_type, filename_list in csv_file_names.items():
-        csv_data, invalid_files = load_csv_data(filename_list)
-        input_files_content.append(csv_data)
-        invalid_file_paths.extend(invalid_files)
     try:
-        xlsx_workbook = load_workbook(xlsx_file_name, read_only=True)
-        input_files_content.append(xlsx_workbook)
+        with profiler.stage('load_logger_data'):
+            wait_for_logger_traces = start_loading_logger_traces(
+                xlsx_file_name,
+                cache_directory,
+                process_pool
+            )
     except FileNotFoundError:
+        wait_for_logger_traces = None
+    with profiler.stage('load_csv_data'):
+        with ThreadPoolExecutor(
+                max_workers=max(len(csv_file_names), 1)
+        ) as thread_pool:
+            csv_file_contents = list(
+                thread_pool.map(load_csv_data, csv_file_names.values())
+            )
+    for csv_data, invalid_files in csv_file_contents:
+        input_files_content.append(csv_data)
+        invalid_file_paths.extend(invalid_files)
+    if wait_for_logger_traces is not None:
+        try:
+            with profiler.stage('load_logger_data'):
+                input_files_content.append(wait_for_logger_traces())
+        except FileNotFoundError:
+            wait_for_logger_traces = None
+    if wait_for_logger_traces is None:
         invalid_file_paths.append(xlsx_file_name)
     return input_files_content, invalid_file_paths
+
+
+def load_campaign_inputs(
+        campaigns: list,
+        cache_directory=None,
+        profiler=DISABLED_PROFILER
+) -> tuple:
+    """Read every fairway, logger and logger data file of campaigns once.
+
+    Returns rows of *.csv files and logger traces of *.xlsx files
+    by their paths and a list of paths of missing files.
+    """
+    csv_file_names = list(OrderedDict.fromkeys(
+        file_path
+        for campaign in campaigns
+        for file_path in (
+            campaign.fairway_points_filepath,
+            campaign.logger_points_filepath
+        )
+    ))
+    xlsx_file_names = list(OrderedDict.fromkeys(
+        campaign.logger_data_filepath for campaign in campaigns
+    ))
+    process_pool = None
+    if xlsx_file_names and (os.cpu_count() or 1) > 1:
+        process_pool = ProcessPoolExecutor(
+            max_workers=min(len(xlsx_file_names), os.cpu_count())
+        )
+    workbooks = OrderedDict()
+    invalid_file_paths = []
+    try:
+        with profiler.stage('load_logger_data'):
+            for xlsx_file_name in xlsx_file_names:
+                try:
+                    workbooks[xlsx_file_name] = start_loading_logger_traces(
+                        xlsx_file_name,
+                        cache_directory,
+                        process_pool
+                    )
+                except FileNotFoundError:
+                    invalid_file_paths.append(xlsx_file_name)
+        with profiler.stage('load_csv_data'):
+            csv_data, invalid_csv_file_paths = load_csv_data(csv_file_names)
+        invalid_file_paths.extend(invalid_csv_file_paths)
+        logger_traces = {}
+        with profiler.stage('load_logger_data'):
+            for xlsx_file_name, wait_for_logger_traces in workbooks.items():
+                try:
+                    logger_traces[xlsx_file_name] = wait_for_logger_traces()
+                except FileNotFoundError:
+                    invalid_file_paths.append(xlsx_file_name)
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    return csv_data, logger_traces, invalid_file_paths
+
+
+def load_input_data(
+        csv_file_names,
+        xlsx_file_name,
+        cache_directory=None,
+        profiler=DISABLED_PROFILER
+):
+    # the workbook is parsed in another process while threads read
+    # the csv files, so loading takes about as long as the slowest input
+    process_pool = None
+    if (os.cpu_count() or 1) > 1:
+        process_pool = ProcessPoolExecutor(max_workers=1)
+    try:
+        return load_input_files(
+            csv_file_names,
+            xlsx_file_name,
+            cache_directory,
+            process_pool,
+            profiler
+        )
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+from openpyxl import load_workbook
+
+from file_manifest import get_file_key
+from points import get_trace_arrays
+from survey_processing import get_logger_trace
+from xlsx_reading import UnsupportedWorkbook, read_logger_workbook
+
+CACHE_FORMAT_VERSION = 1
+
+
+def get_logger_traces(xlsx_workbook) -> dict:
+    all_loggers_data = {}
+    for sheet in xlsx_workbook:
+        logger_trace = {}
+        for row in sheet.iter_rows(min_row=2, max_col=2):
+            measurement_datetime = row[0].value
+            if measurement_datetime is None:
+                break
+            elevation = row[1].value
+            logger_trace[measurement_datetime] = elevation
+        all_loggers_data[sheet.title] = get_trace_arrays(logger_trace)
+    return all_loggers_data
+
+
+def get_workbook_cache_key(
+        xlsx_file_name: str,
+        previous_key: dict = None
+) -> dict:
+    # the workbook is hashed again only if its size or mtime changed
+    cache_key = get_file_key(xlsx_file_name, previous_key)
+    cache_key['version'] = CACHE_FORMAT_VERSION
+    return cache_key
+
+
+def get_cache_paths(cache_directory: str, xlsx_file_name: str) -> dict:
+    path_hash = hashlib.sha1(
+        os.path.abspath(xlsx_file_name).encode('utf-8')
+    ).hexdigest()
+    workbook_cache_directory = os.path.join(cache_directory, path_hash[:16])
+    return {
+        name: os.path.join(workbook_cache_directory, name + extension)
+        for name, extension in (
+            ('meta', '.json'),
+            ('times', '.npy'),
+            ('elevations', '.npy'),
+        )
+    }
+
+
+def read_cache_meta(cache_paths: dict):
+    try:
+        with open(cache_paths['meta'], 'r', encoding='utf-8') as meta_file:
+            cache_meta = json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache_meta, dict) or 'sha256' not in (
+            cache_meta.get('key') or {}
+    ):
+        return None
+    return cache_meta
+
+
+def read_cached_logger_traces(cache_paths: dict, cache_meta: dict):
+    try:
+        # the arrays are memory-mapped, not read into memory
+        times = np.load(cache_paths['times'], mmap_mode='r')
+        elevations = np.load(cache_paths['elevations'], mmap_mode='r')
+        return {
+            sheet_name: (times[start:stop], elevations[start:stop])
+            for sheet_name, start, stop in cache_meta['sheets']
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def replace_with_temporary_file(file_path: str, write, mode: str = 'wb'):
+    """Write a file under a unique temporary name, then rename it.
+
+    Concurrent runs never see or overwrite each other's partial files.
+    """
+    temporary_file = tempfile.NamedTemporaryFile(
+        mode,
+        dir=os.path.dirname(file_path),
+        prefix=os.path.basename(file_path) + '.',
+        suffix='.tmp',
+        delete=False
+    )
+    try:
+        with temporary_file:
+            write(temporary_file)
+        os.replace(temporary_file.name, file_path)
+    except BaseException:
+        os.remove(temporary_file.name)
+        raise
+
+
+def write_cached_logger_traces(
+        cache_paths: dict,
+        cache_key: dict,
+        logger_traces: dict
+):
+    os.makedirs(os.path.dirname(cache_paths['meta']), exist_ok=True)
+    sheets = []
+    start = 0
+    for sheet_name, (times, _) in logger_traces.items():
+        sheets.append([sheet_name, start, start + len(times)])
+        start += len(times)
+    arrays = {
+        'times': [times for times, _ in logger_traces.values()],
+        'elevations': [elevations for _, elevations in logger_traces.values()],
+    }
+    # the metadata goes last, so an interrupted write is never taken as valid
+    if os.path.exists(cache_paths['meta']):
+        os.remove(cache_paths['meta'])
+    for name, sheet_arrays in arrays.items():
+        replace_with_temporary_file(
+            cache_paths[name],
+            lambda array_file: np.save(
+                array_file,
+                np.concatenate(sheet_arrays + [np.empty(0)])
+            )
+        )
+    replace_with_temporary_file(
+        cache_paths['meta'],
+        lambda meta_file: json.dump(
+            {'key': cache_key, 'sheets': sheets},
+            meta_file
+        ),
+        mode='w'
+    )
+
+
+def parse_logger_workbook(xlsx_file_name: str) -> dict:
+    try:
+        sheet_columns = read_logger_workbook(xlsx_file_name)
+    except (UnsupportedWorkbook, zipfile.BadZipFile, KeyError):
+        # openpyxl reads any workbook and reports broken ones
+        return get_logger_traces(load_workbook(xlsx_file_name, read_only=True))
+    return {
+        sheet_name: get_logger_trace(timestamps, elevations)
+        for sheet_name, (timestamps, elevations) in sheet_columns.items()
+    }
+
+
+def set_read_only(logger_traces: dict) -> dict:
+    # traces coming from another process are unpickled as writable copies
+    for arrays in logger_traces.values():
+        for array in arrays:
+            array.flags.writeable = False
+    return logger_traces
+
+
+def start_loading_logger_traces(
+        xlsx_file_name: str,
+        cache_directory: str = None,
+        process_pool=None
+):
+    """Start loading logger traces and return a function waiting for them.
+
+    Cached traces are read at once. Otherwise the workbook is parsed
+    in process_pool, if it is given, while the caller does other work.
+    """
+    cache_key = None
+    if cache_directory:
+        cache_paths = get_cache_paths(cache_directory, xlsx_file_name)
+        cache_meta = read_cache_meta(cache_paths)
+        previous_key = cache_meta and cache_meta['key']
+        cache_key = get_workbook_cache_key(xlsx_file_name, previous_key)
+        if cache_key == previous_key:
+            logger_traces = read_cached_logger_traces(cache_paths, cache_meta)
+            if logger_traces is not None:
+                return lambda: logger_traces
+    if process_pool is None:
+        parsed_traces = parse_logger_workbook(xlsx_file_name)
+        parsing = None
+    else:
+        parsing = process_pool.submit(parse_logger_workbook, xlsx_file_name)
+
+    def wait_for_logger_traces() -> dict:
+        if parsing is None:
+            logger_traces = parsed_traces
+        else:
+            logger_traces = set_read_only(parsing.result())
+        if cache_key is not None:
+            try:
+                write_cached_logger_traces(
+                    cache_paths,
+                    cache_key,
+                    logger_traces
+                )
+            except OSError as error:
+                print('WARNING! Can not cache logger data: {}'.format(error))
+        return logger_traces
+
+    return wait_for_logger_traces
+
+
+def load_logger_traces(xlsx_file_name: str, cache_directory: str = None):
+    return start_loading_logger_traces(xlsx_file_name, cache_directory)()
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import numpy as np
+
+from points import EPOCH
+
+MAX_LOGGER_NUMBER = 64
+
+
+class BathymetryColumns:
+    """Struct-of-arrays storage for a batch of bathymetry points.
+
+    Every point attribute is a typed NumPy column. Loggers and input files
+    are referred to by small integer ids into the shared name and path
+    lists; -1 means no logger. Missing values are NaN.
+    """
+
+    def __init__(
+            self,
+            latitudes,
+            longitudes,
+            timestamps,
+            depths,
+            file_ids,
+            file_paths: list,
+            logger_names: list = ()
+    ):
+        self.latitude = np.asarray(latitudes, dtype=np.float64)
+        self.longitude = np.asarray(longitudes, dtype=np.float64)
+        self.timestamp = np.asarray(timestamps, dtype=np.float64)
+        self.depth = np.asarray(depths, dtype=np.float64)
+        self.file_id = np.asarray(file_ids, dtype=np.int32)
+        point_number = len(self.latitude)
+        self.utm_x = np.full(point_number, np.nan)
+        self.utm_y = np.full(point_number, np.nan)
+        self.distance_from_sea = np.full(point_number, np.nan)
+        self.water_elevation = np.full(point_number, np.nan)
+        self.bottom_elevation = np.full(point_number, np.nan)
+        self.lower_logger_id = np.full(point_number, -1, dtype=np.int8)
+        self.upper_logger_id = np.full(point_number, -1, dtype=np.int8)
+        # bit N is set when the logger with id N was working
+        self.working_logger_mask = np.zeros(point_number, dtype=np.uint64)
+        self.file_paths = file_paths
+        self.logger_names = list(logger_names)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            column.nbytes for column in vars(self).values()
+            if isinstance(column, np.ndarray)
+        )
+
+    def set_logger_names(self, logger_names: list):
+        if len(logger_names) > MAX_LOGGER_NUMBER:
+            raise ValueError(
+                'Can not store more than {} loggers.'.format(MAX_LOGGER_NUMBER)
+            )
+        self.logger_names = list(logger_names)
+
+    def get_working_logger_numbers(self) -> np.ndarray:
+        working_logger_numbers = np.zeros(len(self), dtype=np.int64)
+        for logger_id in range(len(self.logger_names)):
+            is_working = (
+                self.working_logger_mask >> np.uint64(logger_id)
+            ) & np.uint64(1)
+            working_logger_numbers += is_working.astype(np.int64)
+        return working_logger_numbers
+
+    def get_logger_name(self, logger_id: int):
+        if logger_id < 0:
+            return None
+        return self.logger_names[logger_id]
+
+    def get_datetimes(self) -> list:
+        datetimes = {}
+        for timestamp in self.timestamp.tolist():
+            if timestamp not in datetimes:
+                datetimes[timestamp] = EPOCH + timedelta(seconds=timestamp)
+        return [datetimes[timestamp] for timestamp in self.timestamp.tolist()]
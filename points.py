@@ -1,12 +1,85 @@
-import bisect
-from collections import OrderedDict
 from datetime import datetime, timedelta
 from itertools import tee
 from math import hypot
 from typing import Dict
 
+import numpy as np
 import utm
 
+EPOCH = datetime(1970, 1, 1)
+SWITCH_OFF_THRESHOLD = timedelta(minutes=15).total_seconds()
+
+
+def get_timestamp(measurement_datetime: datetime) -> float:
+    # naive datetimes are counted from the epoch as is, without a local
+    # timezone offset, so that logger and sonar times stay comparable
+    return (measurement_datetime - EPOCH).total_seconds()
+
+
+def get_read_only_array(values, dtype=np.float64):
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def get_trace_arrays(logger_data: Dict) -> tuple:
+    # the trace is kept as two sorted arrays built once and shared
+    # read-only by every bathymetry point
+    logger_trace = sorted(logger_data.items(), key=lambda t: t[0])
+    logger_times = get_read_only_array(
+        [get_timestamp(measurement_datetime)
+         for measurement_datetime, _ in logger_trace]
+    )
+    logger_elevations = get_read_only_array(
+        [elevation for _, elevation in logger_trace]
+    )
+    return logger_times, logger_elevations
+
+
+def get_working_intervals(logger_times: np.ndarray) -> tuple:
+    """Return starts and ends of periods when a logger was working.
+
+    A logger works between two samples closer than SWITCH_OFF_THRESHOLD.
+    Runs of such samples give half-open intervals [start, end).
+    """
+    is_short_gap = np.diff(logger_times) < SWITCH_OFF_THRESHOLD
+    # a run of short gaps starts after a long gap and ends before one
+    gap_edges = np.diff(
+        np.concatenate(([0], is_short_gap.astype(np.int8), [0]))
+    )
+    run_starts = np.flatnonzero(gap_edges == 1)
+    run_ends = np.flatnonzero(gap_edges == -1)
+    return logger_times[run_starts], logger_times[run_ends]
+
+
+def interpolate_water_level(
+        lower_level: float,
+        upper_level: float,
+        x1: float,
+        x2: float,
+        desired_x: float
+) -> float:
+    water_slope = (lower_level - upper_level) / (x1 - x2)
+    y_intercept = upper_level - water_slope * x2
+    water_elevation = water_slope * desired_x + y_intercept
+    return water_elevation
+
+
+def get_nearest_loggers(sorted_loggers: list, distance_from_sea: float):
+    logger_iterator, logger_iterator_duplicate = tee(sorted_loggers)
+    next(logger_iterator_duplicate)
+    pairwise_logger_list = zip(logger_iterator, logger_iterator_duplicate)
+
+    for lower_logger, upper_logger in pairwise_logger_list:
+        low_log_distance = lower_logger.distance_from_sea
+        up_log_distance = upper_logger.distance_from_sea
+        if distance_from_sea < low_log_distance:
+            return lower_logger, upper_logger
+        if low_log_distance <= distance_from_sea < up_log_distance:
+            return lower_logger, upper_logger
+
+    return lower_logger, upper_logger
+
 
 class Point:
     def __init__(
@@ -19,9 +92,11 @@ class Point:
         self.longitude = longitude
         self.input_filepath = input_filepath
 
-    def convert_geocoordinates_to_utm(self):
+    def convert_geocoordinates_to_utm(self, zone_number: int = None):
         utm_long, utm_lat, zone_num, zone_letter = utm.from_latlon(
-            self.latitude, self.longitude
+            self.latitude,
+            self.longitude,
+            force_zone_number=zone_number
         )
         self.latitude = utm_lat
         self.longitude = utm_long
@@ -56,13 +131,17 @@ class LoggerPoint(Point):
             input_filepath: str = '',
             distance_from_sea: float = None,
             logger_data: Dict = None,
+            logger_trace: tuple = None,
     ):
         super().__init__(latitude, longitude, input_filepath)
         self.logger_name = logger_name
         self.distance_from_sea = distance_from_sea
-        self.logger_data = OrderedDict(
-            sorted(logger_data.items(), key=lambda t: t[0])
-        )
+        # logger_trace holds sorted read-only arrays of times and elevations,
+        # e.g. memory-mapped from the logger cache
+        if logger_trace is None:
+            logger_trace = get_trace_arrays(logger_data or {})
+        self.logger_times, self.logger_elevations = logger_trace
+        self.working_intervals = None
 
     def get_distance_from_sea(self, points_along_fairway: list):
         closest_fairway_point = min(
@@ -74,16 +153,71 @@ class LoggerPoint(Point):
         )
         self.distance_from_sea = closest_fairway_point.distance_from_sea
 
+    def get_closest_sample_indexes(self, timestamp: float) -> tuple:
+        closest_later_index = int(
+            np.searchsorted(self.logger_times, timestamp, side='right')
+        )
+        # logger trace started after the measurement time
+        if closest_later_index == 0:
+            return None, closest_later_index
+        # logger trace ended before measurement time
+        if closest_later_index == len(self.logger_times):
+            return closest_later_index - 1, None
+        return closest_later_index - 1, closest_later_index
+
+    def is_working_at(self, timestamp: float) -> bool:
+        earlier_index, later_index = self.get_closest_sample_indexes(timestamp)
+        if earlier_index is None or later_index is None:
+            return False
+        time_difference = (
+            self.logger_times[later_index] - self.logger_times[earlier_index]
+        )
+        return time_difference < SWITCH_OFF_THRESHOLD
+
+    def get_working_intervals(self) -> tuple:
+        if self.working_intervals is None:
+            self.working_intervals = get_working_intervals(self.logger_times)
+        return self.working_intervals
+
+    def is_working_during(self, timestamps: np.ndarray) -> np.ndarray:
+        """Vectorized is_working_at() for an array of times."""
+        interval_starts, interval_ends = self.get_working_intervals()
+        if not len(interval_starts):
+            return np.zeros(len(timestamps), dtype=bool)
+        interval_indexes = np.searchsorted(
+            interval_starts,
+            timestamps,
+            side='right'
+        ) - 1
+        return (interval_indexes >= 0) & (
+            timestamps < interval_ends[np.maximum(interval_indexes, 0)]
+        )
+
+    def get_water_level(self, timestamp: float) -> float:
+        earlier_index, later_index = self.get_closest_sample_indexes(timestamp)
+        assert None not in (earlier_index, later_index)
+        return interpolate_water_level(
+            self.logger_elevations[earlier_index],
+            self.logger_elevations[later_index],
+            self.logger_times[earlier_index],
+            self.logger_times[later_index],
+            timestamp
+        )
+
     def round_logger_datetime(self):
-        rounded_logger_data = {}
-        for measurement_datetime, water_elevation in self.logger_data.items():
-            measurement_datetime += timedelta(seconds=30)
-            rounded_datetime = measurement_datetime - timedelta(
-                seconds=measurement_datetime.second,
-                microseconds=measurement_datetime.microsecond
-            )
-            rounded_logger_data[rounded_datetime] = water_elevation
-        self.logger_data = rounded_logger_data
+        rounded_times = np.floor((self.logger_times + 30) / 60) * 60
+        # several samples rounded to the same minute: keep the last one
+        is_last_in_minute = np.append(
+            rounded_times[1:] != rounded_times[:-1],
+            True
+        )[:len(rounded_times)]
+        self.logger_times = get_read_only_array(
+            rounded_times[is_last_in_minute]
+        )
+        self.logger_elevations = get_read_only_array(
+            self.logger_elevations[is_last_in_minute]
+        )
+        self.working_intervals = None
 
 
 class BathymetryPoint(Point):
@@ -102,6 +236,7 @@ class BathymetryPoint(Point):
     ):
         super().__init__(latitude, longitude, input_filepath)
         self.measurement_datetime = measurement_datetime
+        self.measurement_timestamp = get_timestamp(measurement_datetime)
         self.depth = depth
         self.distance_from_sea = distance_from_sea
         self.water_elevation = water_elevation
@@ -121,71 +256,27 @@ class BathymetryPoint(Point):
         )
         self.distance_from_sea = closest_fairway_point.distance_from_sea
 
-    def get_closest_logger_times(self, logger: LoggerPoint) -> tuple:
-        logger_datetimes = list(logger.logger_data.keys())
-        closest_earlier_index = bisect.bisect_right(
-            logger_datetimes,
-            self.measurement_datetime
-        )
-        # logger trace started after the measurement time
-        if closest_earlier_index == 0:
-            return None, logger_datetimes[closest_earlier_index]
-        # logger trace ended before measurement time
-        if closest_earlier_index == len(logger_datetimes):
-            return logger_datetimes[closest_earlier_index - 1], None
-
-        closest_earlier_time = logger_datetimes[closest_earlier_index - 1]
-        closest_later_time = logger_datetimes[closest_earlier_index]
-        return closest_earlier_time, closest_later_time
-
     def get_loggers_working_at_measurement_time(
             self,
             loggers,
     ):
-        switch_off_threshold = timedelta(minutes=15)
         for logger in loggers:
-            closest_logger_times = self.get_closest_logger_times(logger)
-            if None in closest_logger_times:
-                self.switched_off_loggers.append(logger)
-                continue
-            time_difference = closest_logger_times[1] - closest_logger_times[0]
-            if time_difference < switch_off_threshold:
+            if logger.is_working_at(self.measurement_timestamp):
                 self.switched_on_loggers.append(logger)
             else:
                 self.switched_off_loggers.append(logger)
 
     def get_nearest_working_loggers(self):
         self.switched_on_loggers.sort(key=lambda x: x.distance_from_sea)
-        logger_iterator, logger_iterator_duplicate = tee(
-            self.switched_on_loggers
+        self.lower_logger, self.upper_logger = get_nearest_loggers(
+            self.switched_on_loggers,
+            self.distance_from_sea
         )
-        next(logger_iterator_duplicate)
-        pairwise_logger_list = zip(logger_iterator, logger_iterator_duplicate)
-
-        for lower_logger, upper_logger in pairwise_logger_list:
-            low_log_distance = lower_logger.distance_from_sea
-            up_log_distance = upper_logger.distance_from_sea
-            if self.distance_from_sea < low_log_distance:
-                self.lower_logger, self.upper_logger = lower_logger, upper_logger
-                return
-            if low_log_distance <= self.distance_from_sea < up_log_distance:
-                self.lower_logger, self.upper_logger = lower_logger, upper_logger
-                return
-
-        self.lower_logger, self.upper_logger = lower_logger, upper_logger
-
-    @staticmethod
-    def interpolate_water_level(
-            lower_level: float,
-            upper_level: float,
-            x1: float,
-            x2: float,
-            desired_x: float
-    ) -> float:
-        water_slope = (lower_level - upper_level) / (x1 - x2)
-        y_intercept = upper_level - water_slope * x2
-        water_elevation = water_slope * desired_x + y_intercept
-        return water_elevation
+
+    interpolate_water_level = staticmethod(interpolate_water_level)
+
+    def get_logger_water_level(self, logger: LoggerPoint) -> float:
+        return logger.get_water_level(self.measurement_timestamp)
 
     def get_water_elevation(self, logger_points: list):
         self.get_loggers_working_at_measurement_time(logger_points)
@@ -193,28 +284,8 @@ class BathymetryPoint(Point):
             self.water_elevation = None
             return
         self.get_nearest_working_loggers()
-        earlier_time, later_time = self.get_closest_logger_times(
-            self.lower_logger
-        )
-        assert None not in (earlier_time, later_time)
-        lower_elevation = self.interpolate_water_level(
-            self.lower_logger.logger_data[earlier_time],
-            self.lower_logger.logger_data[later_time],
-            earlier_time.timestamp(),
-            later_time.timestamp(),
-            self.measurement_datetime.timestamp()
-        )
-        earlier_time, later_time = self.get_closest_logger_times(
-            self.upper_logger
-        )
-        assert None not in (earlier_time, later_time)
-        upper_elevation = self.interpolate_water_level(
-            self.upper_logger.logger_data[earlier_time],
-            self.upper_logger.logger_data[later_time],
-            earlier_time.timestamp(),
-            later_time.timestamp(),
-            self.measurement_datetime.timestamp()
-        )
+        lower_elevation = self.get_logger_water_level(self.lower_logger)
+        upper_elevation = self.get_logger_water_level(self.upper_logger)
         self.water_elevation = self.interpolate_water_level(
             lower_elevation,
             upper_elevation,
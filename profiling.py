@@ -0,0 +1,226 @@
+import cProfile
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import pstats
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # the resource module is not available on Windows
+    resource = None
+
+STAGE_NAMES = (
+    'load_csv_data',
+    'load_logger_data',
+    'prepare_survey_data',
+    'read_bathymetry',
+    'convert_to_utm',
+    'fairway_search',
+    'water_elevation',
+    'bottom_elevation',
+    'diagnostics',
+    'wait_for_workers',
+    'write_output',
+    'grid_output',
+)
+
+
+class ProfileStats:
+    # pstats.Stats() accepts any object with create_stats() and stats,
+    # so plain stats dictionaries can come back from worker processes
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class StageProfiler:
+    """Wall and CPU time of pipeline stages, counters and rows per file.
+
+    Stage time is exclusive: while a nested stage runs, the time of the
+    enclosing stage is paused, so stage times add up to the total time.
+    A disabled profiler does nothing and costs next to nothing.
+    """
+
+    def __init__(self, enabled: bool = True, profiled_stage: str = None):
+        self.enabled = enabled
+        self.profiled_stage = profiled_stage
+        self.stage_times = OrderedDict()
+        self.counters = OrderedDict()
+        self.file_rows = OrderedDict()
+        self.profile_stats = []
+        self.running_stages = []
+        self.chunk_start_time = None
+
+    def add_running_stage_time(self):
+        if not self.running_stages:
+            return
+        name, wall_start_time, cpu_start_time = self.running_stages[-1]
+        stage_time = self.stage_times.setdefault(name, [0.0, 0.0])
+        stage_time[0] += time.perf_counter() - wall_start_time
+        stage_time[1] += time.process_time() - cpu_start_time
+
+    def restart_running_stage_time(self):
+        if self.running_stages:
+            self.running_stages[-1][1:] = [
+                time.perf_counter(),
+                time.process_time()
+            ]
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        self.add_running_stage_time()
+        self.running_stages.append([name, 0.0, 0.0])
+        self.restart_running_stage_time()
+        stage_profile = None
+        if name == self.profiled_stage:
+            stage_profile = cProfile.Profile()
+            stage_profile.enable()
+        try:
+            yield
+        finally:
+            if stage_profile is not None:
+                stage_profile.disable()
+                stage_profile.create_stats()
+                self.profile_stats.append(stage_profile.stats)
+            self.add_running_stage_time()
+            self.running_stages.pop()
+            self.restart_running_stage_time()
+
+    def iter_stage(self, name: str, iterable):
+        # time spent inside the iterable's next() is counted for the stage
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def start_chunk(self):
+        if self.enabled:
+            self.chunk_start_time = time.perf_counter()
+
+    def add_chunk(self, bathymetry_columns):
+        """Count a processed chunk and share its time among its files."""
+        if not self.enabled:
+            return
+        chunk_seconds = time.perf_counter() - self.chunk_start_time
+        file_row_numbers = np.bincount(
+            bathymetry_columns.file_id,
+            minlength=len(bathymetry_columns.file_paths)
+        )
+        for file_path, row_number in zip(
+                bathymetry_columns.file_paths,
+                file_row_numbers.tolist()
+        ):
+            if row_number:
+                file_rows = self.file_rows.setdefault(file_path, [0, 0.0])
+                file_rows[0] += row_number
+                file_rows[1] += chunk_seconds * (
+                    row_number / len(bathymetry_columns)
+                )
+
+        logger_number = len(bathymetry_columns.logger_names)
+        working_logger_numbers = (
+            bathymetry_columns.get_working_logger_numbers()
+        )
+        self.count('rows', len(bathymetry_columns))
+        # pairs of a point and a logger whose state at the point's time is
+        # known; the number of interval searches is much smaller, since
+        # they run once per logger for a whole chunk
+        self.count(
+            'point_logger_pairs',
+            len(bathymetry_columns) * logger_number
+        )
+        self.count(
+            'switched_off_loggers',
+            np.sum(logger_number - working_logger_numbers)
+        )
+        self.count(
+            'points_without_water_elevation',
+            np.count_nonzero(working_logger_numbers < 2)
+        )
+
+    def merge(self, other_profiler):
+        for name, (wall_seconds, cpu_seconds) in (
+                other_profiler.stage_times.items()
+        ):
+            stage_time = self.stage_times.setdefault(name, [0.0, 0.0])
+            stage_time[0] += wall_seconds
+            stage_time[1] += cpu_seconds
+        for name, value in other_profiler.counters.items():
+            self.count(name, value)
+        for file_path, (row_number, seconds) in (
+                other_profiler.file_rows.items()
+        ):
+            file_rows = self.file_rows.setdefault(file_path, [0, 0.0])
+            file_rows[0] += row_number
+            file_rows[1] += seconds
+        self.profile_stats.extend(other_profiler.profile_stats)
+
+    def get_report(self) -> dict:
+        stages = OrderedDict(
+            (name, {'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds})
+            for name, (wall_seconds, cpu_seconds) in self.stage_times.items()
+        )
+        files = OrderedDict(
+            (file_path, {
+                'rows': row_number,
+                'seconds': seconds,
+                'rows_per_second': row_number / max(seconds, 1e-9),
+            })
+            for file_path, (row_number, seconds) in self.file_rows.items()
+        )
+        return OrderedDict([
+            ('stages', stages),
+            ('files', files),
+            ('peak_rss_bytes', get_peak_rss(is_children=False)),
+            ('peak_worker_rss_bytes', get_peak_rss(is_children=True)),
+            ('counters', self.counters),
+        ])
+
+    def write_report(self, report_path: str):
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.get_report(), report_file, indent=2)
+
+    def write_profile_dump(self, dump_path: str):
+        if not self.profile_stats:
+            print(
+                'WARNING! The stage {} did not run, '
+                'no profile is written.'.format(self.profiled_stage)
+            )
+            return
+        stats = pstats.Stats(ProfileStats(self.profile_stats[0]))
+        for stage_stats in self.profile_stats[1:]:
+            stats.add(ProfileStats(stage_stats))
+        stats.dump_stats(dump_path)
+
+
+def get_peak_rss(is_children: bool):
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(
+        resource.RUSAGE_CHILDREN if is_children else resource.RUSAGE_SELF
+    ).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+# a shared profiler for code running without profiling, it keeps no state
+DISABLED_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,106 @@
+import numpy as np
+import utm
+
+# the same ellipsoid constants as the utm package uses
+K0 = 0.9996
+E = 0.00669438
+E2 = E * E
+E3 = E2 * E
+E_P2 = E / (1 - E)
+M1 = (1 - E / 4 - 3 * E2 / 64 - 5 * E3 / 256)
+M2 = (3 * E / 8 + 3 * E2 / 32 + 45 * E3 / 1024)
+M3 = (15 * E2 / 256 + 45 * E3 / 1024)
+M4 = (35 * E3 / 3072)
+R = 6378137
+
+
+def get_utm_zone(latitudes, longitudes) -> tuple:
+    # the whole survey is projected into the zone of its centre, so points
+    # near a zone boundary do not end up in different coordinate frames
+    central_latitude = float(np.mean(latitudes))
+    central_longitude = float(np.mean(longitudes))
+    zone_number = utm.latlon_to_zone_number(
+        central_latitude,
+        central_longitude
+    )
+    northern = central_latitude >= 0
+    return zone_number, northern
+
+
+def get_points_utm_zone(points: list) -> tuple:
+    return get_utm_zone(
+        [point.latitude for point in points],
+        [point.longitude for point in points]
+    )
+
+
+def convert_to_utm(
+        latitudes,
+        longitudes,
+        zone_number: int,
+        northern: bool = True
+) -> tuple:
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    if latitudes.size and not (
+            -80 <= latitudes.min() and latitudes.max() <= 84
+    ):
+        raise ValueError(
+            'Latitude out of range (must be between 80 deg S and 84 deg N).'
+        )
+
+    lat_rad = np.radians(latitudes)
+    lat_sin = np.sin(lat_rad)
+    lat_cos = np.cos(lat_rad)
+    lat_tan = lat_sin / lat_cos
+    lat_tan2 = lat_tan * lat_tan
+    lat_tan4 = lat_tan2 * lat_tan2
+
+    central_lon_rad = np.radians((zone_number - 1) * 6 - 180 + 3)
+    lon_difference = np.radians(longitudes) - central_lon_rad
+    lon_difference = (lon_difference + np.pi) % (2 * np.pi) - np.pi
+
+    n = R / np.sqrt(1 - E * lat_sin ** 2)
+    c = E_P2 * lat_cos ** 2
+    a = lat_cos * lon_difference
+    a2 = a * a
+    a3 = a2 * a
+    a4 = a3 * a
+    a5 = a4 * a
+    a6 = a5 * a
+    m = R * (
+        M1 * lat_rad
+        - M2 * np.sin(2 * lat_rad)
+        + M3 * np.sin(4 * lat_rad)
+        - M4 * np.sin(6 * lat_rad)
+    )
+
+    easting = K0 * n * (
+        a
+        + a3 / 6 * (1 - lat_tan2 + c)
+        + a5 / 120 * (5 - 18 * lat_tan2 + lat_tan4 + 72 * c - 58 * E_P2)
+    ) + 500000
+    northing = K0 * (m + n * lat_tan * (
+        a2 / 2
+        + a4 / 24 * (5 - lat_tan2 + 9 * c + 4 * c ** 2)
+        + a6 / 720 * (61 - 58 * lat_tan2 + lat_tan4 + 600 * c - 330 * E_P2)
+    ))
+    if not northern:
+        northing += 10000000
+    return easting, northing
+
+
+def convert_points_to_utm(points: list, zone_number: int, northern: bool):
+    eastings, northings = convert_to_utm(
+        [point.latitude for point in points],
+        [point.longitude for point in points],
+        zone_number,
+        northern
+    )
+    for point, easting, northing in zip(
+            points,
+            eastings.tolist(),
+            northings.tolist()
+    ):
+        point.longitude = easting
+        point.latitude = northing
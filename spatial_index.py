@@ -0,0 +1,173 @@
+from collections import defaultdict
+from itertools import product
+from math import floor, sqrt
+
+import numpy as np
+
+
+class FairwayIndex:
+    """Uniform grid over UTM fairway points for nearest-point queries.
+
+    Queries return the same fairway point as a linear scan with
+    min(..., key=hypot): the closest one, the first in input order on ties.
+    """
+
+    def __init__(self, fairway_points: list, points_per_cell: int = 4):
+        if not fairway_points:
+            raise ValueError('Can not build an index without fairway points.')
+        self.fairway_points = fairway_points
+        self.x = np.array([p.longitude for p in fairway_points], dtype=float)
+        self.y = np.array([p.latitude for p in fairway_points], dtype=float)
+        self.distances_from_sea = np.array(
+            [p.distance_from_sea for p in fairway_points],
+            dtype=float
+        )
+
+        self.min_x, self.min_y = self.x.min(), self.y.min()
+        width = self.x.max() - self.min_x
+        height = self.y.max() - self.min_y
+        # a straight fairway has almost no area, cells are then sized by
+        # the spacing of points along its longer side
+        self.cell_size = max(
+            sqrt(width * height * points_per_cell / len(fairway_points)),
+            max(width, height) * points_per_cell / len(fairway_points),
+            1.0
+        )
+        columns, rows = self.get_cells(self.x, self.y)
+        self.cells = defaultdict(list)
+        for point_index, cell in enumerate(zip(columns, rows)):
+            self.cells[cell].append(point_index)
+        self.cells = {
+            cell: np.array(point_indexes)
+            for cell, point_indexes in self.cells.items()
+        }
+        self.max_column = max(column for column, _ in self.cells)
+        self.max_row = max(row for _, row in self.cells)
+
+    def get_cells(self, x, y) -> tuple:
+        columns = np.floor((x - self.min_x) / self.cell_size).astype(int)
+        rows = np.floor((y - self.min_y) / self.cell_size).astype(int)
+        return columns.tolist(), rows.tolist()
+
+    def get_ring_candidates(self, column: int, row: int, ring: int) -> list:
+        if ring == 0:
+            cells = [(column, row)]
+        else:
+            cells = [
+                (column + offset, row + shift)
+                for offset in range(-ring, ring + 1)
+                for shift in (-ring, ring)
+            ] + [
+                (column + shift, row + offset)
+                for offset in range(-ring + 1, ring)
+                for shift in (-ring, ring)
+            ]
+        return [self.cells[cell] for cell in cells if cell in self.cells]
+
+    def get_candidates(
+            self,
+            first_column: int,
+            last_column: int,
+            first_row: int,
+            last_row: int
+    ) -> np.ndarray:
+        """Return indexes of points in a box of cells in input order."""
+        first_column, last_column = (
+            max(first_column, 0),
+            min(last_column, self.max_column)
+        )
+        first_row, last_row = max(first_row, 0), min(last_row, self.max_row)
+        cell_number = (
+            (last_column - first_column + 1) * (last_row - first_row + 1)
+        )
+        if first_column > last_column or first_row > last_row:
+            candidates = []
+        elif cell_number > len(self.cells):
+            candidates = [
+                point_indexes
+                for (column, row), point_indexes in self.cells.items()
+                if first_column <= column <= last_column
+                and first_row <= row <= last_row
+            ]
+        else:
+            candidates = [
+                self.cells[cell]
+                for cell in product(
+                    range(first_column, last_column + 1),
+                    range(first_row, last_row + 1)
+                )
+                if cell in self.cells
+            ]
+        if not candidates:
+            return np.empty(0, dtype=int)
+        # ascending input order makes argmin pick the first point on ties
+        return np.sort(np.concatenate(candidates))
+
+    def get_nearest_indexes(self, x, y) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        nearest_indexes = np.empty(len(x), dtype=int)
+        columns, rows = self.get_cells(x, y)
+        # queries outside the grid start from its nearest cell
+        grid_columns = np.clip(columns, 0, self.max_column).tolist()
+        grid_rows = np.clip(rows, 0, self.max_row).tolist()
+        query_cells = defaultdict(list)
+        for query_index, cell in enumerate(zip(grid_columns, grid_rows)):
+            query_cells[cell].append(query_index)
+        columns, rows = np.array(columns), np.array(rows)
+
+        for (grid_column, grid_row), query_indexes in query_cells.items():
+            query_indexes = np.array(query_indexes)
+            query_x, query_y = x[query_indexes], y[query_indexes]
+            # the first non-empty ring gives an upper bound of the distance
+            # to the nearest point
+            ring = 0
+            while not self.get_ring_candidates(grid_column, grid_row, ring):
+                ring += 1
+            candidates = self.get_candidates(
+                grid_column - ring,
+                grid_column + ring,
+                grid_row - ring,
+                grid_row + ring
+            )
+            distances = np.hypot(
+                self.x[candidates] - query_x[:, np.newaxis],
+                self.y[candidates] - query_y[:, np.newaxis]
+            )
+            max_distance = distances.min(axis=1).max()
+            # a point N cells away from the query cell is at least N - 1
+            # cells away from the query, every cell within the bound is
+            # checked
+            search_ring = int(floor(max_distance / self.cell_size)) + 1
+            query_columns = columns[query_indexes]
+            query_rows = rows[query_indexes]
+            is_inside_cell = (
+                (query_columns == grid_column).all()
+                and (query_rows == grid_row).all()
+            )
+            if search_ring > ring or not is_inside_cell:
+                candidates = self.get_candidates(
+                    int(query_columns.min()) - search_ring,
+                    int(query_columns.max()) + search_ring,
+                    int(query_rows.min()) - search_ring,
+                    int(query_rows.max()) + search_ring
+                )
+                distances = np.hypot(
+                    self.x[candidates] - query_x[:, np.newaxis],
+                    self.y[candidates] - query_y[:, np.newaxis]
+                )
+            nearest_indexes[query_indexes] = candidates[
+                distances.argmin(axis=1)
+            ]
+        return nearest_indexes
+
+    def get_distances_from_sea(self, x, y) -> np.ndarray:
+        return self.distances_from_sea[self.get_nearest_indexes(x, y)]
+
+    def set_distances_from_sea(self, points: list):
+        distances = self.get_distances_from_sea(
+            [point.longitude for point in points],
+            [point.latitude for point in points]
+        )
+        for point, distance_from_sea in zip(points, distances.tolist()):
+            point.distance_from_sea = distance_from_sea
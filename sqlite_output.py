@@ -0,0 +1,205 @@
+import os
+import sqlite3
+
+import numpy as np
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS loggers (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS soundings (
+        id INTEGER PRIMARY KEY,
+        longitude REAL NOT NULL,
+        latitude REAL NOT NULL,
+        bottom_elevation REAL,
+        time TEXT NOT NULL,
+        water_elevation REAL,
+        depth REAL,
+        distance_from_seashore REAL,
+        file_id INTEGER NOT NULL REFERENCES files (id),
+        upper_logger_id INTEGER REFERENCES loggers (id),
+        lower_logger_id INTEGER REFERENCES loggers (id)
+    )
+    ''',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS soundings_rtree USING rtree (
+        id,
+        min_longitude,
+        max_longitude,
+        min_latitude,
+        max_latitude
+    )
+    ''',
+)
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS soundings_time ON soundings (time)',
+    'CREATE INDEX IF NOT EXISTS soundings_file ON soundings (file_id)',
+)
+INSERT_SOUNDINGS = (
+    'INSERT INTO soundings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+)
+INSERT_RTREE = 'INSERT INTO soundings_rtree VALUES (?, ?, ?, ?, ?)'
+
+
+def get_lookup_id(connection, table: str, column: str, value: str) -> int:
+    connection.execute(
+        'INSERT OR IGNORE INTO {} ({}) VALUES (?)'.format(table, column),
+        (value,)
+    )
+    row = connection.execute(
+        'SELECT id FROM {} WHERE {} = ?'.format(table, column),
+        (value,)
+    ).fetchone()
+    return row[0]
+
+
+def get_nullable_values(values: np.ndarray) -> list:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def get_database_ids(connection, table, column, names, chunk_ids) -> list:
+    database_ids = {
+        index: get_lookup_id(connection, table, column, name)
+        for index, name in enumerate(names)
+    }
+    return [database_ids.get(index) for index in chunk_ids.tolist()]
+
+
+def insert_result_columns(connection, bathymetry_columns):
+    first_id = connection.execute(
+        'SELECT COALESCE(MAX(id), 0) + 1 FROM soundings'
+    ).fetchone()[0]
+    sounding_ids = range(first_id, first_id + len(bathymetry_columns))
+    utm_x = bathymetry_columns.utm_x.tolist()
+    utm_y = bathymetry_columns.utm_y.tolist()
+    file_ids = get_database_ids(
+        connection,
+        'files',
+        'path',
+        bathymetry_columns.file_paths,
+        bathymetry_columns.file_id
+    )
+    logger_ids = [
+        get_database_ids(
+            connection,
+            'loggers',
+            'name',
+            bathymetry_columns.logger_names,
+            chunk_logger_ids
+        )
+        for chunk_logger_ids in (
+            bathymetry_columns.upper_logger_id,
+            bathymetry_columns.lower_logger_id
+        )
+    ]
+    connection.executemany(
+        INSERT_SOUNDINGS,
+        zip(
+            sounding_ids,
+            utm_x,
+            utm_y,
+            get_nullable_values(bathymetry_columns.bottom_elevation),
+            [str(value) for value in bathymetry_columns.get_datetimes()],
+            get_nullable_values(bathymetry_columns.water_elevation),
+            get_nullable_values(bathymetry_columns.depth),
+            bathymetry_columns.distance_from_sea.tolist(),
+            file_ids,
+            *logger_ids
+        )
+    )
+    connection.executemany(
+        INSERT_RTREE,
+        zip(sounding_ids, utm_x, utm_x, utm_y, utm_y)
+    )
+
+
+def delete_file_results(connection, file_paths):
+    for file_path in file_paths:
+        file_filter = 'SELECT id FROM files WHERE path = ?'
+        connection.execute(
+            '''DELETE FROM soundings_rtree WHERE id IN (
+                SELECT id FROM soundings WHERE file_id IN ({})
+            )'''.format(file_filter),
+            (file_path,)
+        )
+        connection.execute(
+            'DELETE FROM soundings WHERE file_id IN ({})'.format(file_filter),
+            (file_path,)
+        )
+        connection.execute('DELETE FROM files WHERE path = ?', (file_path,))
+
+
+def write_result_database(
+        output_path: str,
+        bathymetry_chunks,
+        stale_file_paths: list = None
+):
+    """Write processed chunks into an SQLite database.
+
+    Every chunk is inserted in one transaction. Without stale_file_paths
+    the database is created from scratch, otherwise the points of these
+    files are deleted and the new points are appended.
+    """
+    if stale_file_paths is None and os.path.exists(output_path):
+        os.remove(output_path)
+    connection = sqlite3.connect(output_path)
+    try:
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            delete_file_results(connection, stale_file_paths or [])
+        for bathymetry_columns in bathymetry_chunks:
+            with connection:
+                insert_result_columns(connection, bathymetry_columns)
+        # building the indexes once after the bulk load is faster
+        # than updating them on every insert
+        with connection:
+            for statement in INDEXES:
+                connection.execute(statement)
+    finally:
+        connection.close()
+
+
+def query_bounding_box(
+        connection,
+        min_longitude: float,
+        min_latitude: float,
+        max_longitude: float,
+        max_latitude: float
+) -> list:
+    # R-tree boxes are stored with 32-bit floats, so the index gives
+    # candidates and exact coordinates are checked afterwards
+    return connection.execute(
+        '''
+        SELECT soundings.* FROM soundings_rtree
+        JOIN soundings ON soundings.id = soundings_rtree.id
+        WHERE max_longitude >= :min_x AND min_longitude <= :max_x
+        AND max_latitude >= :min_y AND min_latitude <= :max_y
+        AND soundings.longitude BETWEEN :min_x AND :max_x
+        AND soundings.latitude BETWEEN :min_y AND :max_y
+        ''',
+        {
+            'min_x': min_longitude,
+            'max_x': max_longitude,
+            'min_y': min_latitude,
+            'max_y': max_latitude,
+        }
+    ).fetchall()
+
+
+def query_time_range(connection, start_time: str, end_time: str) -> list:
+    return connection.execute(
+        'SELECT * FROM soundings WHERE time BETWEEN ? AND ? ORDER BY time',
+        (start_time, end_time)
+    ).fetchall()
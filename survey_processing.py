@@ -0,0 +1,310 @@
+"""Survey processing on in-memory arrays, without input or output files.
+
+The command line tool reads files into these structures and writes the
+processed columns, other programs may call process_survey() directly.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from point_columns import BathymetryColumns
+from points import FairwayPoint, LoggerPoint, get_timestamp
+from profiling import DISABLED_PROFILER
+from projection import (
+    convert_points_to_utm,
+    convert_to_utm,
+    get_points_utm_zone,
+)
+from spatial_index import FairwayIndex
+from water_elevation import (
+    calculate_bottom_elevations,
+    calculate_water_elevations,
+    calculate_water_elevations_vectorized,
+)
+from water_surface import (
+    WaterSurfaceTable,
+    calculate_table_water_elevations,
+)
+
+SurveyData = namedtuple(
+    'SurveyData',
+    [
+        'utm_zone',
+        'is_northern',
+        'fairway_index',
+        'logger_points',
+        'water_surface',
+    ]
+)
+ProcessingOptions = namedtuple(
+    'ProcessingOptions',
+    ['chunk_size', 'workers', 'vectorized']
+)
+DEFAULT_PROCESSING_OPTIONS = ProcessingOptions(
+    chunk_size=10000,
+    workers=1,
+    vectorized=False
+)
+
+
+def get_timestamps(times) -> np.ndarray:
+    """Convert times to seconds since the epoch.
+
+    Accepts numpy datetime64 values, naive datetime objects and
+    numbers that already are seconds since the epoch.
+    """
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return (
+            times - np.datetime64(0, 's')
+        ) / np.timedelta64(1, 's')
+    if times.dtype == object and times.size and isinstance(
+            times.flat[0],
+            datetime
+    ):
+        return np.array(
+            [get_timestamp(measurement_datetime) for measurement_datetime
+             in times.tolist()],
+            dtype=np.float64
+        )
+    return times.astype(np.float64)
+
+
+def get_logger_trace(times, elevations) -> tuple:
+    """Return sorted read-only arrays of a logger trace.
+
+    Of several samples with the same time the last one is kept,
+    as it is when a trace is read from the logger workbook.
+    """
+    timestamps = get_timestamps(times)
+    elevations = np.asarray(elevations, dtype=np.float64)
+    if len(timestamps) != len(elevations):
+        raise ValueError('Logger times and elevations differ in length.')
+    # the reversed stable sort puts the last sample of a time first
+    order = len(timestamps) - 1 - np.argsort(
+        timestamps[::-1],
+        kind='stable'
+    )
+    timestamps, elevations = timestamps[order], elevations[order]
+    is_first = np.ones(len(timestamps), dtype=bool)
+    is_first[1:] = timestamps[1:] != timestamps[:-1]
+    logger_times = timestamps[is_first]
+    logger_elevations = elevations[is_first]
+    logger_times.flags.writeable = False
+    logger_elevations.flags.writeable = False
+    return logger_times, logger_elevations
+
+
+def prepare_survey_data(
+        fairway_points: list,
+        logger_points: list,
+        fairway_indexes: dict = None
+):
+    """Project reference points to UTM and index the fairway.
+
+    fairway_indexes may hold indexes of earlier surveys by their fairway
+    and UTM zone, an index of the same fairway and zone is reused.
+    """
+    utm_zone, is_northern = get_points_utm_zone(fairway_points + logger_points)
+    convert_points_to_utm(logger_points, utm_zone, is_northern)
+    if fairway_indexes is None:
+        fairway_indexes = {}
+    # points are compared before their projection, by geocoordinates
+    fairway_key = (
+        tuple(
+            (point.latitude, point.longitude, point.distance_from_sea)
+            for point in fairway_points
+        ),
+        utm_zone,
+        is_northern
+    )
+    fairway_index = fairway_indexes.get(fairway_key)
+    if fairway_index is None:
+        convert_points_to_utm(fairway_points, utm_zone, is_northern)
+        fairway_index = FairwayIndex(fairway_points)
+        fairway_indexes[fairway_key] = fairway_index
+    fairway_index.set_distances_from_sea(logger_points)
+    return SurveyData(
+        utm_zone,
+        is_northern,
+        fairway_index,
+        logger_points,
+        None
+    )
+
+
+def prepare_water_surface(survey_data, time_step: float):
+    """Return survey data with a water surface table of the time step."""
+    return survey_data._replace(water_surface=WaterSurfaceTable(
+        survey_data.logger_points,
+        time_step,
+        survey_data.fairway_index.distances_from_sea
+    ))
+
+
+def prepare_survey(
+        fairway_vertices,
+        logger_coordinates,
+        logger_traces: dict
+):
+    """Build survey data from fairway, logger positions and logger traces.
+
+    fairway_vertices are (latitude, longitude, distance from sea) rows,
+    logger_coordinates are (logger name, latitude, longitude) rows and
+    logger_traces map logger names to pairs of time and elevation arrays.
+    """
+    fairway_points = [
+        FairwayPoint(float(latitude), float(longitude), float(distance))
+        for latitude, longitude, distance in fairway_vertices
+    ]
+    logger_points = []
+    for logger_name, latitude, longitude in logger_coordinates:
+        logger_points.append(LoggerPoint(
+            logger_name,
+            float(latitude),
+            float(longitude),
+            logger_trace=get_logger_trace(*logger_traces[logger_name])
+        ))
+    return prepare_survey_data(fairway_points, logger_points)
+
+
+def process_bathymetry_columns(
+        bathymetry_columns,
+        survey_data,
+        processing_options,
+        profiler=DISABLED_PROFILER
+):
+    with profiler.stage('convert_to_utm'):
+        bathymetry_columns.utm_x, bathymetry_columns.utm_y = convert_to_utm(
+            bathymetry_columns.latitude,
+            bathymetry_columns.longitude,
+            survey_data.utm_zone,
+            survey_data.is_northern
+        )
+    with profiler.stage('fairway_search'):
+        bathymetry_columns.distance_from_sea = (
+            survey_data.fairway_index.get_distances_from_sea(
+                bathymetry_columns.utm_x,
+                bathymetry_columns.utm_y
+            )
+        )
+    with profiler.stage('water_elevation'):
+        if survey_data.water_surface is not None:
+            calculate_table_water_elevations(
+                bathymetry_columns,
+                survey_data.logger_points,
+                survey_data.water_surface
+            )
+        elif processing_options.vectorized:
+            calculate_water_elevations_vectorized(
+                bathymetry_columns,
+                survey_data.logger_points
+            )
+        else:
+            calculate_water_elevations(
+                bathymetry_columns,
+                survey_data.logger_points
+            )
+    with profiler.stage('bottom_elevation'):
+        calculate_bottom_elevations(bathymetry_columns)
+
+
+def process_soundings(
+        survey_data,
+        latitudes,
+        longitudes,
+        times,
+        depths,
+        processing_options=DEFAULT_PROCESSING_OPTIONS
+):
+    """Process soundings against prepared survey data.
+
+    Soundings are processed in chunks of processing_options.chunk_size,
+    so temporary arrays stay small. Returns BathymetryColumns with
+    utm_x, utm_y, distance_from_sea, water_elevation, bottom_elevation
+    and logger id columns in the order of the soundings.
+    """
+    timestamps = get_timestamps(times)
+    result = BathymetryColumns(
+        latitudes,
+        longitudes,
+        timestamps,
+        depths,
+        np.zeros(len(timestamps), dtype=np.int32),
+        [None]
+    )
+    for chunk_start in range(0, len(result), processing_options.chunk_size):
+        chunk_slice = slice(
+            chunk_start,
+            chunk_start + processing_options.chunk_size
+        )
+        bathymetry_columns = BathymetryColumns(
+            result.latitude[chunk_slice],
+            result.longitude[chunk_slice],
+            result.timestamp[chunk_slice],
+            result.depth[chunk_slice],
+            result.file_id[chunk_slice],
+            result.file_paths
+        )
+        process_bathymetry_columns(
+            bathymetry_columns,
+            survey_data,
+            processing_options
+        )
+        for column_name in (
+                'utm_x',
+                'utm_y',
+                'distance_from_sea',
+                'water_elevation',
+                'bottom_elevation',
+                'lower_logger_id',
+                'upper_logger_id',
+                'working_logger_mask',
+        ):
+            getattr(result, column_name)[chunk_slice] = getattr(
+                bathymetry_columns,
+                column_name
+            )
+    result.set_logger_names(
+        [logger.logger_name for logger in survey_data.logger_points]
+    )
+    return result
+
+
+def process_survey(
+        latitudes,
+        longitudes,
+        times,
+        depths,
+        fairway_vertices,
+        logger_coordinates,
+        logger_traces: dict,
+        vectorized: bool = False,
+        chunk_size: int = DEFAULT_PROCESSING_OPTIONS.chunk_size,
+        water_surface_step: float = None
+):
+    """Calculate water and bottom elevations of soundings in memory.
+
+    Soundings are given as arrays or iterables of latitudes, longitudes,
+    measurement times and depths, see prepare_survey() for the reference
+    data. Times are datetime64 values, naive datetimes or seconds since
+    the epoch. Missing depths are NaN. With water_surface_step water
+    elevations are looked up in a table of water surface with this time
+    step in seconds, see WaterSurfaceTable.
+    """
+    survey_data = prepare_survey(
+        fairway_vertices,
+        logger_coordinates,
+        logger_traces
+    )
+    if water_surface_step is not None:
+        survey_data = prepare_water_surface(survey_data, water_surface_step)
+    return process_soundings(
+        survey_data,
+        np.fromiter(latitudes, dtype=np.float64),
+        np.fromiter(longitudes, dtype=np.float64),
+        times if isinstance(times, np.ndarray) else list(times),
+        np.fromiter(depths, dtype=np.float64),
+        ProcessingOptions(chunk_size, 1, vectorized)
+    )
@@ -0,0 +1,7 @@
+import os
+import sys
+
+REPOSITORY_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+sys.path.insert(0, REPOSITORY_DIRECTORY)
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import numpy as np
+
+from bathymetry_csv import iter_bathymetry_blocks
+from points import get_timestamp
+
+ROWS = [
+    '38.1;63.1;2,5;107;0;0:00;15.08.2017 10:50',
+    '38.2;63.2;3.5;107;0;0:00;15.08.2017 10:51',
+    '38.3;63.3;4,0;107;0;0:00;15.08.2017 10:52',
+    '38.4;63.4;4,5;107;0;0:00;15.08.2017 10:53',
+]
+
+
+def read_file(file_path, block_size: int = 1 << 20) -> tuple:
+    invalid_files = []
+    blocks = list(iter_bathymetry_blocks(
+        str(file_path),
+        invalid_files,
+        block_size
+    ))
+    columns = [
+        np.concatenate(column) for column in zip(*blocks)
+    ] if blocks else [np.empty(0)] * 4
+    return columns, [
+        (invalid_file.line_number, invalid_file.invalid_row)
+        for invalid_file in invalid_files
+    ]
+
+
+def write_file(tmp_path, content: bytes):
+    file_path = tmp_path / 'sonar.csv'
+    file_path.write_bytes(content)
+    return file_path
+
+
+def test_valid_rows(tmp_path):
+    file_path = write_file(tmp_path, '\n'.join(ROWS).encode() + b'\n')
+    (latitudes, longitudes, timestamps, depths), invalid_rows = (
+        read_file(file_path)
+    )
+    assert latitudes.tolist() == [63.1, 63.2, 63.3, 63.4]
+    assert longitudes.tolist() == [38.1, 38.2, 38.3, 38.4]
+    assert depths.tolist() == [2.5, 3.5, 4.0, 4.5]
+    assert timestamps[0] == get_timestamp(datetime(2017, 8, 15, 10, 50))
+    assert invalid_rows == []
+
+
+def test_crlf_and_last_line_without_newline(tmp_path):
+    expected_columns, _ = read_file(
+        write_file(tmp_path, '\n'.join(ROWS).encode() + b'\n')
+    )
+    for content in (
+            '\r\n'.join(ROWS).encode() + b'\r\n',
+            '\r\n'.join(ROWS).encode(),
+            '\n'.join(ROWS).encode(),
+    ):
+        columns, invalid_rows = read_file(write_file(tmp_path, content))
+        for column, expected_column in zip(columns, expected_columns):
+            assert column.tolist() == expected_column.tolist()
+        assert invalid_rows == []
+
+
+def test_invalid_rows_are_reported_by_line_number(tmp_path):
+    lines = [
+        ROWS[0],
+        '38.2;63.2;3.5',
+        ROWS[1],
+        'x;63.3;4,0;107;0;0:00;15.08.2017 10:52',
+        '',
+        '38.4;63.4;4,5;107;0;0:00;not a date',
+        '38.5;63.5;4,5;107;0;0:00;15.08.2017 10:54;extra',
+        ROWS[2],
+        '38.6;63.6;wrong;107;0;0:00;15.08.2017 10:55',
+    ]
+    (latitudes, _, _, depths), invalid_rows = read_file(
+        write_file(tmp_path, '\r\n'.join(lines).encode())
+    )
+    assert invalid_rows == [
+        (2, ['38.2', '63.2', '3.5']),
+        (4, ['x', '63.3', '4,0', '107', '0', '0:00', '15.08.2017 10:52']),
+        (6, ['38.4', '63.4', '4,5', '107', '0', '0:00', 'not a date']),
+        (7, [
+            '38.5', '63.5', '4,5', '107', '0', '0:00', '15.08.2017 10:54',
+            'extra'
+        ]),
+    ]
+    # a wrong depth does not make the row invalid
+    assert latitudes.tolist() == [63.1, 63.2, 63.3, 63.6]
+    assert np.isnan(depths[-1])
+
+
+def test_rows_split_across_blocks(tmp_path):
+    lines = ROWS * 5
+    lines[13] = 'broken row'
+    content = '\n'.join(lines).encode()
+    expected_columns, expected_invalid_rows = read_file(
+        write_file(tmp_path, content)
+    )
+    assert expected_invalid_rows == [(14, ['broken row'])]
+    # block sizes fall inside rows, blocks are extended to whole lines
+    for block_size in (1, 10, 45, 100):
+        columns, invalid_rows = read_file(
+            write_file(tmp_path, content),
+            block_size
+        )
+        for column, expected_column in zip(columns, expected_columns):
+            assert column.tolist() == expected_column.tolist()
+        assert invalid_rows == expected_invalid_rows
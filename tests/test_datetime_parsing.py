@@ -0,0 +1,26 @@
+from datetime_parsing import DatetimeParser, parse_with_dateutil
+
+
+def test_year_first_dates_agree_with_dateutil():
+    parser = DatetimeParser(['2017-08-13 10:50'] * 20)
+    for datetime_str in ('2017-08-05 10:50', '2017-08-13 10:50'):
+        assert parser.parse(datetime_str) == (
+            parse_with_dateutil(datetime_str)
+        )
+
+
+def test_day_first_dates_use_fast_path():
+    parser = DatetimeParser(['15.08.2017 10:50', '05.08.2017 10:51'])
+    assert parser.fast_parser is not None
+    assert parser.parse('05.08.2017 11:00') == (
+        parse_with_dateutil('05.08.2017 11:00')
+    )
+
+
+def test_two_digit_years_agree_with_dateutil():
+    parser = DatetimeParser(['08.08.17 10:50'] * 20)
+    assert parser.fast_parser is not None
+    for datetime_str in ('08.08.69 10:50', '08.08.75 10:50', '08.08.17 10:50'):
+        assert parser.parse(datetime_str) == (
+            parse_with_dateutil(datetime_str)
+        )
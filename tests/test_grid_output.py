@@ -0,0 +1,35 @@
+import numpy as np
+
+from grid_output import ElevationGrid
+
+
+def test_distant_points_are_written_as_cells():
+    grid = ElevationGrid(10)
+    grid.add_points(
+        np.array([464005.0, 464007.0, 509005.0, 5.0]),
+        np.array([7077005.0, 7077001.0, 7077005.0, 5.0]),
+        np.array([-1.0, -3.0, -2.0, 0.5])
+    )
+    arrays = grid.get_arrays()
+    assert arrays['x_min'] == 0 and arrays['y_min'] == 0
+    assert arrays['row'].tolist() == [0, 707700, 707700]
+    assert arrays['column'].tolist() == [0, 46400, 50900]
+    assert arrays['count'].tolist() == [1, 2, 1]
+    assert arrays['mean'].tolist() == [0.5, -2.0, -2.0]
+    assert arrays['min'].tolist() == [0.5, -3.0, -2.0]
+
+
+def test_raster_spans_tiles():
+    grid = ElevationGrid(1)
+    grid.add_points(
+        np.array([-0.5, 70.5]),
+        np.array([0.5, 1.5]),
+        np.array([1.0, 2.0])
+    )
+    arrays = grid.get_arrays()
+    assert 'row' not in arrays
+    assert arrays['x_min'] == -1 and arrays['y_min'] == 0
+    assert arrays['count'].shape == (2, 72)
+    assert arrays['count'][0, 0] == 1 and arrays['count'][1, 71] == 1
+    assert arrays['count'].sum() == 2
+    assert np.isnan(arrays['mean'][0, 1])
@@ -0,0 +1,126 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+REPOSITORY_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+SONAR_FILEPATH = os.path.join(
+    REPOSITORY_DIRECTORY,
+    'bathymetry_data',
+    'Sonar0000_out_t.csv'
+)
+SOUNDING_QUERY = '''
+    SELECT
+        soundings.longitude,
+        soundings.latitude,
+        soundings.bottom_elevation,
+        soundings.time,
+        soundings.water_elevation,
+        soundings.depth,
+        soundings.distance_from_seashore,
+        files.path,
+        upper_loggers.name,
+        lower_loggers.name,
+        soundings_rtree.min_longitude,
+        soundings_rtree.min_latitude
+    FROM soundings
+    JOIN files ON files.id = soundings.file_id
+    LEFT JOIN loggers AS upper_loggers
+        ON upper_loggers.id = soundings.upper_logger_id
+    LEFT JOIN loggers AS lower_loggers
+        ON lower_loggers.id = soundings.lower_logger_id
+    LEFT JOIN soundings_rtree ON soundings_rtree.id = soundings.id
+'''
+
+
+def run_data_processing(
+        bathymetry_directory: str,
+        output_path: str,
+        *options
+):
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(REPOSITORY_DIRECTORY, 'data_processing.py'),
+            '-b', bathymetry_directory,
+            '-f', os.path.join(REPOSITORY_DIRECTORY, 'fairway_points.csv'),
+            '-l', os.path.join(REPOSITORY_DIRECTORY, 'logger_points.csv'),
+            '-x', os.path.join(REPOSITORY_DIRECTORY, 'logger_data.xlsx'),
+            '-o', output_path,
+            '--cache_directory',
+            os.path.join(os.path.dirname(output_path), 'cache'),
+        ] + list(options),
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+
+
+def read_soundings(database_path: str) -> list:
+    connection = sqlite3.connect(database_path)
+    try:
+        soundings = connection.execute(SOUNDING_QUERY).fetchall()
+        file_paths = connection.execute('SELECT path FROM files').fetchall()
+        rtree_size = connection.execute(
+            'SELECT COUNT(*) FROM soundings_rtree'
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    # row ids depend on the insertion history, the stored values do not
+    assert rtree_size == len(soundings)
+    return sorted(soundings, key=repr), sorted(file_paths)
+
+
+def write_sonar_rows(file_path: str, rows: list):
+    with open(file_path, 'w', encoding='utf-8') as sonar_file:
+        sonar_file.writelines(rows)
+
+
+def assert_same_as_full_run(tmp_path, bathymetry_directory: str):
+    full_csv_path = str(tmp_path / 'full' / 'output.csv')
+    full_database_path = str(tmp_path / 'full' / 'output.db')
+    shutil.rmtree(str(tmp_path / 'full'), ignore_errors=True)
+    os.makedirs(str(tmp_path / 'full'))
+    run_data_processing(bathymetry_directory, full_csv_path)
+    run_data_processing(bathymetry_directory, full_database_path)
+
+    with open(str(tmp_path / 'output.csv'), 'rb') as incremental_file:
+        with open(full_csv_path, 'rb') as full_file:
+            assert incremental_file.read() == full_file.read()
+    assert (
+        read_soundings(str(tmp_path / 'output.db'))
+        == read_soundings(full_database_path)
+    )
+
+
+def test_incremental_run_matches_full_run(tmp_path):
+    with open(SONAR_FILEPATH, encoding='utf-8') as sonar_file:
+        sonar_rows = sonar_file.readlines()
+    bathymetry_directory = str(tmp_path / 'bathymetry')
+    os.makedirs(bathymetry_directory)
+    first_file_path = os.path.join(bathymetry_directory, 'a.csv')
+    second_file_path = os.path.join(bathymetry_directory, 'b.csv')
+    write_sonar_rows(first_file_path, sonar_rows[:40])
+
+    def run_incrementally():
+        for output_name in ('output.csv', 'output.db'):
+            run_data_processing(
+                bathymetry_directory,
+                str(tmp_path / output_name),
+                '--incremental'
+            )
+
+    run_incrementally()
+    assert_same_as_full_run(tmp_path, bathymetry_directory)
+
+    # an added file is processed and merged with the previous output
+    write_sonar_rows(second_file_path, sonar_rows[40:])
+    run_incrementally()
+    assert_same_as_full_run(tmp_path, bathymetry_directory)
+
+    # the rows of a changed file replace its previous ones
+    write_sonar_rows(first_file_path, sonar_rows[10:50])
+    run_incrementally()
+    assert_same_as_full_run(tmp_path, bathymetry_directory)
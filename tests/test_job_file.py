@@ -0,0 +1,132 @@
+import json
+import os
+from argparse import Namespace
+
+import pytest
+
+from input_data_loading import read_job_file
+from test_incremental_output import (
+    REPOSITORY_DIRECTORY,
+    SONAR_FILEPATH,
+    read_soundings,
+    run_data_processing,
+    write_sonar_rows,
+)
+
+SCRIPT_ARGUMENTS = Namespace(
+    bathymetry_directory='bathymetry_data/',
+    fairway_points_filepath='fairway_points.csv',
+    logger_points_filepath='logger_points.csv',
+    logger_data_filepath='logger_data.xlsx',
+    output_filepath='output.csv',
+)
+
+
+def write_job_file(tmp_path, jobs) -> str:
+    job_file_path = str(tmp_path / 'job.json')
+    with open(job_file_path, 'w', encoding='utf-8') as job_file:
+        json.dump(jobs, job_file)
+    return job_file_path
+
+
+def test_campaign_paths_default_to_script_arguments(tmp_path):
+    job_file_path = write_job_file(tmp_path, [
+        {'name': 'june', 'output_filepath': 'june.csv'},
+        {
+            'bathymetry_directory': 'july/',
+            'logger_data_filepath': 'logger_data_july.xlsx',
+            'output_filepath': 'july.db',
+            'grid_filepath': 'july.npz',
+        },
+    ])
+    june, july = read_job_file(job_file_path, SCRIPT_ARGUMENTS)
+    assert june.name == 'june'
+    assert june.bathymetry_directory == 'bathymetry_data/'
+    assert june.logger_data_filepath == 'logger_data.xlsx'
+    assert june.grid_filepath is None
+    assert july.name == 'july.db'
+    assert july.bathymetry_directory == 'july/'
+    assert july.fairway_points_filepath == 'fairway_points.csv'
+    assert july.logger_data_filepath == 'logger_data_july.xlsx'
+    assert july.grid_filepath == 'july.npz'
+
+
+@pytest.mark.parametrize('jobs, message', [
+    ({'output_filepath': 'june.csv'}, 'must hold a list'),
+    ([], 'holds no campaigns'),
+    (
+        [{'output_filepath': 'june.csv'}, {'name': 'july'}],
+        'Campaign 2 has no output_filepath'
+    ),
+    (['june.csv'], 'Campaign 1 has no output_filepath'),
+    (
+        [{'output_filepath': 'june.csv', 'outptu': 'x', 'workers': 2}],
+        'Campaign 1 has unknown keys: outptu, workers'
+    ),
+    (
+        [
+            {'name': 'june', 'output_filepath': 'output.csv'},
+            {'name': 'july', 'output_filepath': 'output.csv'},
+        ],
+        'different output files'
+    ),
+    (
+        [
+            {'name': 'june', 'output_filepath': 'output.csv'},
+            {'name': 'july', 'output_filepath': './output.csv'},
+        ],
+        'different output files'
+    ),
+])
+def test_wrong_job_files_are_rejected(tmp_path, jobs, message):
+    job_file_path = write_job_file(tmp_path, jobs)
+    with pytest.raises(ValueError, match=message):
+        read_job_file(job_file_path, SCRIPT_ARGUMENTS)
+
+
+def test_campaign_output_matches_single_run(tmp_path):
+    with open(SONAR_FILEPATH, encoding='utf-8') as sonar_file:
+        sonar_rows = sonar_file.readlines()
+    june_directory = str(tmp_path / 'june')
+    july_directory = str(tmp_path / 'july')
+    os.makedirs(june_directory)
+    os.makedirs(july_directory)
+    write_sonar_rows(os.path.join(june_directory, 'a.csv'), sonar_rows[:30])
+    write_sonar_rows(os.path.join(june_directory, 'b.csv'), sonar_rows[30:60])
+    write_sonar_rows(os.path.join(july_directory, 'a.csv'), sonar_rows[50:])
+    os.makedirs(str(tmp_path / 'single'))
+    os.makedirs(str(tmp_path / 'campaigns'))
+    job_file_path = write_job_file(tmp_path, [
+        {
+            'name': 'june',
+            'output_filepath': str(tmp_path / 'campaigns' / 'june.csv'),
+        },
+        {
+            'name': 'july',
+            'bathymetry_directory': july_directory,
+            'logger_data_filepath': os.path.join(
+                REPOSITORY_DIRECTORY,
+                'logger_data.xlsx'
+            ),
+            'output_filepath': str(tmp_path / 'campaigns' / 'july.db'),
+        },
+    ])
+    # sonar files of both campaigns are split between workers
+    run_data_processing(
+        june_directory,
+        str(tmp_path / 'campaigns' / 'unused.csv'),
+        '--job_file', job_file_path,
+        '--workers', '2',
+        '--chunk_size', '20'
+    )
+    run_data_processing(june_directory, str(tmp_path / 'single' / 'june.csv'))
+    run_data_processing(july_directory, str(tmp_path / 'single' / 'july.db'))
+
+    assert not os.path.exists(str(tmp_path / 'campaigns' / 'unused.csv'))
+    with open(str(tmp_path / 'campaigns' / 'june.csv'), 'rb') as campaign_file:
+        with open(str(tmp_path / 'single' / 'june.csv'), 'rb') as single_file:
+            assert campaign_file.read() == single_file.read()
+    assert (
+        read_soundings(str(tmp_path / 'campaigns' / 'july.db'))
+        == read_soundings(str(tmp_path / 'single' / 'july.db'))
+    )
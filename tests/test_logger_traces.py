@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import numpy as np
+
+import file_manifest
+from logger_traces import load_logger_traces
+
+LOGGER_DATA_FILEPATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'logger_data.xlsx'
+)
+
+
+def count_hashes(monkeypatch) -> list:
+    hashed_paths = []
+    get_file_hash = file_manifest.get_file_hash
+
+    def get_counted_file_hash(file_path: str) -> str:
+        hashed_paths.append(file_path)
+        return get_file_hash(file_path)
+
+    monkeypatch.setattr(file_manifest, 'get_file_hash', get_counted_file_hash)
+    return hashed_paths
+
+
+def test_cache_hit_does_not_hash_workbook(tmp_path, monkeypatch):
+    workbook_path = str(tmp_path / 'logger_data.xlsx')
+    shutil.copy(LOGGER_DATA_FILEPATH, workbook_path)
+    cache_directory = str(tmp_path / 'cache')
+    hashed_paths = count_hashes(monkeypatch)
+
+    parsed_traces = load_logger_traces(workbook_path, cache_directory)
+    assert len(hashed_paths) == 1
+    cached_traces = load_logger_traces(workbook_path, cache_directory)
+    assert len(hashed_paths) == 1
+    assert list(cached_traces) == list(parsed_traces)
+    for sheet_name, (times, elevations) in parsed_traces.items():
+        assert isinstance(cached_traces[sheet_name][0], np.memmap)
+        np.testing.assert_array_equal(cached_traces[sheet_name][0], times)
+        np.testing.assert_array_equal(
+            cached_traces[sheet_name][1],
+            elevations
+        )
+    # no temporary files are left behind
+    for _, _, file_names in os.walk(cache_directory):
+        assert not [name for name in file_names if name.endswith('.tmp')]
+
+    # a rewritten workbook is hashed again
+    os.utime(workbook_path, ns=(0, 0))
+    load_logger_traces(workbook_path, cache_directory)
+    assert len(hashed_paths) == 2
+    load_logger_traces(workbook_path, cache_directory)
+    assert len(hashed_paths) == 2
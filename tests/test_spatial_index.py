@@ -0,0 +1,70 @@
+from math import hypot
+import time
+
+import numpy as np
+
+from points import FairwayPoint
+from spatial_index import FairwayIndex
+
+
+def get_fairway_points() -> list:
+    # a bent fairway in UTM metres, roughly 20 km long
+    x = np.linspace(460000, 470000, 200)
+    y = 7070000 + np.abs(x - 465000) * 1.5
+    return [
+        FairwayPoint(latitude, longitude, float(index * 100))
+        for index, (longitude, latitude) in enumerate(zip(x, y))
+    ]
+
+
+def get_nearest_by_linear_scan(fairway_points: list, x, y) -> list:
+    return [
+        min(
+            range(len(fairway_points)),
+            key=lambda index: hypot(
+                fairway_points[index].longitude - query_x,
+                fairway_points[index].latitude - query_y
+            )
+        )
+        for query_x, query_y in zip(x, y)
+    ]
+
+
+def test_matches_linear_scan_near_fairway():
+    fairway_points = get_fairway_points()
+    index = FairwayIndex(fairway_points)
+    random = np.random.RandomState(0)
+    x = random.uniform(459000, 471000, 500)
+    y = random.uniform(7069000, 7080000, 500)
+    assert index.get_nearest_indexes(x, y).tolist() == (
+        get_nearest_by_linear_scan(fairway_points, x, y)
+    )
+
+
+def test_point_far_outside_fairway():
+    fairway_points = get_fairway_points()
+    index = FairwayIndex(fairway_points)
+    x = [0.0, 465000.0, 1e7]
+    y = [0.0, -5e6, 7075000.0]
+    started_at = time.perf_counter()
+    nearest_indexes = index.get_nearest_indexes(x, y)
+    assert time.perf_counter() - started_at < 1
+    assert nearest_indexes.tolist() == (
+        get_nearest_by_linear_scan(fairway_points, x, y)
+    )
+
+
+def test_straight_fairway_and_ties_match_linear_scan():
+    # points on a whole-metre lattice give many exactly equal distances
+    random = np.random.RandomState(1)
+    x = np.arange(0, 4000, 10, dtype=float)[random.permutation(400)]
+    fairway_points = [
+        FairwayPoint(7070000.0 + (longitude % 20), 460000.0 + longitude, 0.0)
+        for longitude in x.tolist()
+    ]
+    index = FairwayIndex(fairway_points)
+    query_x = 460000.0 + random.randint(-200, 4200, 2000)
+    query_y = 7070000.0 + random.randint(-300, 300, 2000)
+    assert index.get_nearest_indexes(query_x, query_y).tolist() == (
+        get_nearest_by_linear_scan(fairway_points, query_x, query_y)
+    )
@@ -0,0 +1,242 @@
+from datetime import timedelta
+
+import numpy as np
+
+from point_columns import BathymetryColumns
+from points import EPOCH, BathymetryPoint, LoggerPoint
+from water_elevation import (
+    calculate_bottom_elevations,
+    calculate_water_elevations,
+    calculate_water_elevations_vectorized,
+)
+from water_surface import WaterSurfaceTable, calculate_table_water_elevations
+
+SURVEY_SECONDS = 6 * 3600
+
+
+def get_logger_points() -> list:
+    random = np.random.RandomState(1)
+    # two pairs of loggers share a chainage
+    chainages = [1000.0, 5000.0, 5000.0, 9000.0, 9000.0, 14000.0, 20000.0]
+    logger_points = []
+    for logger_id, chainage in enumerate(chainages):
+        times = np.arange(0, SURVEY_SECONDS, 60)
+        is_kept = np.ones(len(times), dtype=bool)
+        # gaps of 14, 15 and 16 minutes around the switch-off threshold
+        for gap_start in random.randint(0, len(times), 4).tolist():
+            gap_minutes = int(random.choice([14, 15, 16, 45]))
+            is_kept[gap_start + 1:gap_start + gap_minutes] = False
+        if logger_id == 6:
+            # a logger switched off for the whole survey
+            is_kept[:] = False
+        logger_data = {
+            EPOCH + timedelta(seconds=seconds): elevation
+            for seconds, elevation in zip(
+                times[is_kept].tolist(),
+                (np.sin(times[is_kept] / 5000 - chainage / 3000)
+                 + random.normal(0, 0.01, is_kept.sum())).tolist()
+            )
+        }
+        logger_points.append(LoggerPoint(
+            str(logger_id),
+            0.0,
+            0.0,
+            distance_from_sea=chainage,
+            logger_data=logger_data
+        ))
+    return logger_points
+
+
+def get_survey() -> tuple:
+    random = np.random.RandomState(2)
+    point_number = 3000
+    timestamps = random.randint(-600, SURVEY_SECONDS + 600, point_number)
+    # some points lie exactly at logger chainages or sample times
+    timestamps[::7] = timestamps[::7] // 60 * 60
+    distances = random.uniform(0, 22000, point_number)
+    distances[::5] = random.choice(
+        [1000.0, 5000.0, 9000.0, 14000.0, 20000.0],
+        len(distances[::5])
+    )
+    depths = random.uniform(1, 10, point_number)
+    return timestamps.astype(float), distances, depths
+
+
+def get_columns(timestamps, distances, depths) -> BathymetryColumns:
+    columns = BathymetryColumns(
+        np.zeros(len(timestamps)),
+        np.zeros(len(timestamps)),
+        timestamps,
+        depths,
+        np.zeros(len(timestamps)),
+        ['survey.csv']
+    )
+    columns.distance_from_sea = distances.copy()
+    return columns
+
+
+def get_point_results(logger_points, timestamps, distances, depths) -> tuple:
+    water_elevations, bottom_elevations, logger_pairs = [], [], []
+    for timestamp, distance, depth in zip(
+            timestamps.tolist(),
+            distances.tolist(),
+            depths.tolist()
+    ):
+        point = BathymetryPoint(
+            0.0,
+            0.0,
+            EPOCH + timedelta(seconds=timestamp),
+            depth,
+            distance_from_sea=distance
+        )
+        # loggers at the same chainage give an infinite slope
+        with np.errstate(invalid='ignore', divide='ignore'):
+            point.get_water_elevation(logger_points)
+        point.get_bottom_elevation()
+        water_elevations.append(
+            np.nan if point.water_elevation is None else point.water_elevation
+        )
+        bottom_elevations.append(
+            np.nan if point.bottom_elevation is None
+            else point.bottom_elevation
+        )
+        logger_pairs.append((
+            point.lower_logger and point.lower_logger.logger_name,
+            point.upper_logger and point.upper_logger.logger_name
+        ))
+    return (
+        np.array(water_elevations),
+        np.array(bottom_elevations),
+        logger_pairs
+    )
+
+
+def get_column_results(columns) -> tuple:
+    calculate_bottom_elevations(columns)
+    logger_pairs = [
+        (columns.get_logger_name(lower_id), columns.get_logger_name(upper_id))
+        for lower_id, upper_id in zip(
+            columns.lower_logger_id.tolist(),
+            columns.upper_logger_id.tolist()
+        )
+    ]
+    return columns.water_elevation, columns.bottom_elevation, logger_pairs
+
+
+def test_engines_agree_with_bathymetry_points():
+    logger_points = get_logger_points()
+    timestamps, distances, depths = get_survey()
+    expected_results = get_point_results(
+        logger_points,
+        timestamps,
+        distances,
+        depths
+    )
+    # the survey must cover points with and without water elevation
+    assert 0 < np.isnan(expected_results[0]).sum() < len(timestamps) / 2
+
+    for calculate in (
+            calculate_water_elevations,
+            calculate_water_elevations_vectorized
+    ):
+        columns = get_columns(timestamps, distances, depths)
+        calculate(columns, logger_points)
+        water_elevations, bottom_elevations, logger_pairs = (
+            get_column_results(columns)
+        )
+        np.testing.assert_array_equal(water_elevations, expected_results[0])
+        np.testing.assert_array_equal(bottom_elevations, expected_results[1])
+        assert logger_pairs == expected_results[2]
+
+
+def test_logger_pairs_and_masks_agree():
+    logger_points = get_logger_points()
+    timestamps, distances, depths = get_survey()
+    columns = get_columns(timestamps, distances, depths)
+    calculate_water_elevations(columns, logger_points)
+    vectorized_columns = get_columns(timestamps, distances, depths)
+    calculate_water_elevations_vectorized(vectorized_columns, logger_points)
+    full_mask = (1 << len(logger_points)) - 1
+    assert (columns.working_logger_mask != full_mask).all()
+    assert len(np.unique(columns.working_logger_mask)) > 4
+    for name in ('working_logger_mask', 'lower_logger_id', 'upper_logger_id'):
+        np.testing.assert_array_equal(
+            getattr(columns, name),
+            getattr(vectorized_columns, name)
+        )
+
+
+def get_gap_edge_times(logger_points: list) -> np.ndarray:
+    """Return times around the edges of gaps in logger traces."""
+    edge_times = []
+    for logger in logger_points:
+        times = np.asarray(logger.logger_times, dtype=float)
+        gap_starts = np.flatnonzero(np.diff(times) > 60)
+        for edge_time in np.concatenate((
+                times[gap_starts],
+                times[gap_starts + 1]
+        )).tolist():
+            edge_times.extend(edge_time + offset for offset in (-1, 0, 1))
+    return np.array(edge_times)
+
+
+def test_water_surface_table_agrees_within_reported_error():
+    logger_points = get_logger_points()
+    timestamps, distances, depths = get_survey()
+    # points near the ends of logger gaps, where working loggers change
+    edge_times = get_gap_edge_times(logger_points)
+    random = np.random.RandomState(3)
+    timestamps = np.concatenate((timestamps, edge_times))
+    distances = np.concatenate((
+        distances,
+        random.uniform(0, 22000, len(edge_times))
+    ))
+    depths = np.concatenate((
+        depths,
+        random.uniform(1, 10, len(edge_times))
+    ))
+    table = WaterSurfaceTable(logger_points, 300, [0.0, 22000.0])
+    # the survey starts before and ends after the table time range
+    table_end_time = table.start_time + table.time_step * (
+        len(table.elevations) - 1
+    )
+    assert timestamps.min() < table.start_time
+    assert timestamps.max() > table_end_time
+
+    columns = get_columns(timestamps, distances, depths)
+    calculate_water_elevations(columns, logger_points)
+    table_columns = get_columns(timestamps, distances, depths)
+    calculate_table_water_elevations(table_columns, logger_points, table)
+    for name in ('working_logger_mask', 'lower_logger_id', 'upper_logger_id'):
+        np.testing.assert_array_equal(
+            getattr(table_columns, name),
+            getattr(columns, name)
+        )
+    np.testing.assert_array_equal(
+        np.isnan(table_columns.water_elevation),
+        np.isnan(columns.water_elevation)
+    )
+
+    _, is_found = table.look_up(
+        timestamps,
+        distances,
+        columns.working_logger_mask
+    )
+    is_found &= columns.lower_logger_id >= 0
+    assert 0 < is_found.sum() < len(timestamps)
+    assert table.max_error > 0
+    # looked up elevations are within the error reported at sample times,
+    # the rest are calculated exactly
+    errors = np.abs(table_columns.water_elevation - columns.water_elevation)
+    assert errors[is_found].max() <= table.max_error + 1e-9
+    np.testing.assert_array_equal(
+        table_columns.water_elevation[~is_found],
+        columns.water_elevation[~is_found]
+    )
+    is_outside = (timestamps < table.start_time) | (
+        timestamps > table_end_time
+    )
+    assert not is_found[is_outside].any()
+    is_near_gap = np.zeros(len(timestamps), dtype=bool)
+    is_near_gap[-len(edge_times):] = True
+    assert (is_near_gap & ~is_found).any()
@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+from openpyxl import load_workbook
+
+from logger_traces import get_logger_traces, parse_logger_workbook
+from xlsx_reading import read_logger_workbook
+
+LOGGER_DATA_FILEPATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'logger_data.xlsx'
+)
+
+
+def test_bundled_workbook_matches_openpyxl():
+    # the bundled workbook must not fall back to openpyxl
+    sheet_columns = read_logger_workbook(LOGGER_DATA_FILEPATH)
+    expected_traces = get_logger_traces(
+        load_workbook(LOGGER_DATA_FILEPATH, read_only=True)
+    )
+    assert list(sheet_columns) == list(expected_traces)
+    logger_traces = parse_logger_workbook(LOGGER_DATA_FILEPATH)
+    assert list(logger_traces) == list(expected_traces)
+    for sheet_name, (logger_times, logger_elevations) in (
+            expected_traces.items()
+    ):
+        assert len(logger_times) > 1
+        np.testing.assert_array_equal(
+            logger_traces[sheet_name][0],
+            logger_times
+        )
+        np.testing.assert_array_equal(
+            logger_traces[sheet_name][1],
+            logger_elevations
+        )
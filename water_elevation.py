@@ -0,0 +1,238 @@
+from functools import lru_cache
+
+import numpy as np
+
+from points import (
+    SWITCH_OFF_THRESHOLD,
+    get_read_only_array,
+    interpolate_water_level,
+)
+
+WORKING_SET_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=WORKING_SET_CACHE_SIZE)
+def get_working_set_breakpoints(
+        working_logger_mask: int,
+        logger_distances: tuple
+) -> tuple:
+    """Return ids and chainages of working loggers sorted by chainage.
+
+    Loggers at the same chainage keep their order, as the stable sort
+    of BathymetryPoint.get_nearest_working_loggers() does.
+    """
+    working_logger_ids = sorted(
+        (
+            logger_id for logger_id in range(len(logger_distances))
+            if working_logger_mask >> logger_id & 1
+        ),
+        key=logger_distances.__getitem__
+    )
+    return (
+        get_read_only_array(working_logger_ids, dtype=np.int64),
+        get_read_only_array(
+            [logger_distances[logger_id] for logger_id in working_logger_ids]
+        )
+    )
+
+
+def iter_working_set_points(working_logger_masks: np.ndarray):
+    """Yield every working logger mask with indexes of its points."""
+    working_sets, point_working_sets, point_numbers = np.unique(
+        working_logger_masks,
+        return_inverse=True,
+        return_counts=True
+    )
+    point_order = np.argsort(point_working_sets.ravel(), kind='mergesort')
+    set_ends = np.cumsum(point_numbers)
+    for working_set, set_end, point_number in zip(
+            working_sets.tolist(),
+            set_ends.tolist(),
+            point_numbers.tolist()
+    ):
+        yield working_set, point_order[set_end - point_number:set_end]
+
+
+def get_pair_water_levels(
+        logger_points: list,
+        logger_ids: np.ndarray,
+        timestamps: np.ndarray
+) -> np.ndarray:
+    water_levels = np.full(len(timestamps), np.nan)
+    for logger_id in np.unique(logger_ids).tolist():
+        points = np.flatnonzero(logger_ids == logger_id)
+        _, water_levels[points] = get_logger_water_levels(
+            logger_points[logger_id],
+            timestamps[points]
+        )
+    return water_levels
+
+
+def set_logger_pairs(columns, logger_points: list):
+    """Find working loggers and the logger pair of every point.
+
+    Loggers are checked against their working intervals. Points with the
+    same set of working loggers share the chainage breakpoints of the set,
+    a logger pair of a point is found by a binary search among them.
+    """
+    columns.set_logger_names([logger.logger_name for logger in logger_points])
+    if not len(columns):
+        return
+    working_logger_masks = np.zeros(len(columns), dtype=np.uint64)
+    for logger_id, logger in enumerate(logger_points):
+        is_working = logger.is_working_during(columns.timestamp)
+        working_logger_masks[is_working] |= np.uint64(1 << logger_id)
+    columns.working_logger_mask = working_logger_masks
+
+    logger_distances = tuple(
+        logger.distance_from_sea for logger in logger_points
+    )
+    for working_set, points in iter_working_set_points(working_logger_masks):
+        working_logger_ids, breakpoints = get_working_set_breakpoints(
+            working_set,
+            logger_distances
+        )
+        if len(working_logger_ids) < 2:
+            continue
+        # the pair is the first one whose upper logger lies beyond the point,
+        # or the last pair when the point lies beyond every logger
+        lower_ranks = np.minimum(
+            np.searchsorted(
+                breakpoints[1:],
+                columns.distance_from_sea[points],
+                side='right'
+            ),
+            len(working_logger_ids) - 2
+        )
+        columns.lower_logger_id[points] = working_logger_ids[lower_ranks]
+        columns.upper_logger_id[points] = working_logger_ids[lower_ranks + 1]
+
+
+def set_pair_water_elevations(
+        columns,
+        logger_points: list,
+        points: np.ndarray
+):
+    """Interpolate water elevations of points between their logger pairs."""
+    lower_ids = columns.lower_logger_id[points].astype(np.int64)
+    upper_ids = columns.upper_logger_id[points].astype(np.int64)
+    timestamps = columns.timestamp[points]
+    logger_distances = np.array(
+        [logger.distance_from_sea for logger in logger_points],
+        dtype=np.float64
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns.water_elevation[points] = interpolate_water_level(
+            get_pair_water_levels(logger_points, lower_ids, timestamps),
+            get_pair_water_levels(logger_points, upper_ids, timestamps),
+            logger_distances[lower_ids],
+            logger_distances[upper_ids],
+            columns.distance_from_sea[points]
+        )
+
+
+def calculate_water_elevations(columns, logger_points: list):
+    """Compute water elevations of points grouped by working loggers."""
+    set_logger_pairs(columns, logger_points)
+    set_pair_water_elevations(
+        columns,
+        logger_points,
+        np.flatnonzero(columns.lower_logger_id >= 0)
+    )
+
+
+def calculate_bottom_elevations(columns):
+    columns.bottom_elevation = columns.water_elevation - columns.depth
+    # the same rule as BathymetryPoint.get_bottom_elevation follows
+    columns.bottom_elevation[columns.water_elevation == 0] = np.nan
+
+
+def get_logger_water_levels(logger, timestamps: np.ndarray) -> tuple:
+    logger_times = logger.logger_times
+    logger_elevations = logger.logger_elevations
+    if len(logger_times) < 2:
+        return np.zeros(len(timestamps), dtype=bool), None
+    later_indexes = np.searchsorted(logger_times, timestamps, side='right')
+    is_inside_trace = (later_indexes > 0) & (later_indexes < len(logger_times))
+    later_indexes = np.clip(later_indexes, 1, len(logger_times) - 1)
+    earlier_indexes = later_indexes - 1
+    earlier_times = logger_times[earlier_indexes]
+    later_times = logger_times[later_indexes]
+    is_working = is_inside_trace & (
+        later_times - earlier_times < SWITCH_OFF_THRESHOLD
+    )
+    water_levels = interpolate_water_level(
+        logger_elevations[earlier_indexes],
+        logger_elevations[later_indexes],
+        earlier_times,
+        later_times,
+        timestamps
+    )
+    return is_working, water_levels
+
+
+def calculate_water_elevations_vectorized(columns, logger_points: list):
+    """Compute the same water elevations as calculate_water_elevations()
+    for the whole batch at once with array operations."""
+    columns.set_logger_names([logger.logger_name for logger in logger_points])
+    point_number, logger_number = len(columns), len(logger_points)
+    if not point_number or not logger_number:
+        return
+    is_working = np.zeros((point_number, logger_number), dtype=bool)
+    water_levels = np.full((point_number, logger_number), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for logger_id, logger in enumerate(logger_points):
+            logger_is_working, logger_levels = get_logger_water_levels(
+                logger,
+                columns.timestamp
+            )
+            is_working[:, logger_id] = logger_is_working
+            if logger_levels is not None:
+                water_levels[:, logger_id] = logger_levels
+    logger_bits = np.uint64(1) << np.arange(logger_number, dtype=np.uint64)
+    columns.working_logger_mask = np.bitwise_or.reduce(
+        np.where(is_working, logger_bits, np.uint64(0)),
+        axis=1
+    )
+
+    # working loggers are ordered by chainage as a stable sort would do
+    logger_distances = np.array(
+        [logger.distance_from_sea for logger in logger_points],
+        dtype=np.float64
+    )
+    logger_order = np.argsort(logger_distances, kind='mergesort')
+    sorted_distances = logger_distances[logger_order]
+    sorted_is_working = is_working[:, logger_order]
+    working_numbers = sorted_is_working.sum(axis=1)
+    working_ranks = np.cumsum(sorted_is_working, axis=1) - 1
+    # the pair is the first one whose upper logger lies beyond the point,
+    # or the last pair when the point lies beyond every logger
+    distances_from_sea = columns.distance_from_sea[:, np.newaxis]
+    passed_upper_loggers = (
+        sorted_is_working
+        & (working_ranks >= 1)
+        & (sorted_distances <= distances_from_sea)
+    ).sum(axis=1)
+    lower_ranks = np.minimum(passed_upper_loggers, working_numbers - 2)
+    lower_positions = np.argmax(
+        sorted_is_working & (working_ranks == lower_ranks[:, np.newaxis]),
+        axis=1
+    )
+    upper_positions = np.argmax(
+        sorted_is_working & (working_ranks == lower_ranks[:, np.newaxis] + 1),
+        axis=1
+    )
+    has_pair = working_numbers >= 2
+    points = np.flatnonzero(has_pair)
+    lower_ids = logger_order[lower_positions[has_pair]]
+    upper_ids = logger_order[upper_positions[has_pair]]
+    columns.lower_logger_id[points] = lower_ids
+    columns.upper_logger_id[points] = upper_ids
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns.water_elevation[points] = interpolate_water_level(
+            water_levels[points, lower_ids],
+            water_levels[points, upper_ids],
+            logger_distances[lower_ids],
+            logger_distances[upper_ids],
+            columns.distance_from_sea[points]
+        )
@@ -0,0 +1,229 @@
+import numpy as np
+
+from point_columns import BathymetryColumns
+from water_elevation import (
+    calculate_water_elevations,
+    set_logger_pairs,
+    set_pair_water_elevations,
+)
+
+# number of time steps calculated at once while the table is built
+TABLE_BUILD_STEPS = 4096
+
+
+def get_grid_water_elevations(
+        logger_points: list,
+        timestamps: np.ndarray,
+        chainages: np.ndarray
+) -> tuple:
+    """Calculate exact water elevations at every time and chainage.
+
+    Returns a table of elevations with a row per time and a column per
+    chainage and working logger masks of the times.
+    """
+    point_number = len(timestamps) * len(chainages)
+    columns = BathymetryColumns(
+        np.zeros(point_number),
+        np.zeros(point_number),
+        np.repeat(timestamps, len(chainages)),
+        np.zeros(point_number),
+        np.zeros(point_number, dtype=np.int32),
+        [None]
+    )
+    columns.distance_from_sea = np.tile(chainages, len(timestamps))
+    calculate_water_elevations(columns, logger_points)
+    return (
+        columns.water_elevation.reshape(len(timestamps), len(chainages)),
+        columns.working_logger_mask[::len(chainages)]
+    )
+
+
+class WaterSurfaceTable:
+    """Water elevations precalculated over time steps and chainages.
+
+    Rows of the table are regular time steps over the logger traces,
+    columns are chainages of loggers and of the fairway ends. Between two
+    chainages the water surface is linear, so a bilinear lookup differs
+    from the exact calculation only by interpolation in time. Points whose
+    working loggers differ from those of the surrounding time steps are
+    calculated exactly.
+    """
+
+    def __init__(
+            self,
+            logger_points: list,
+            time_step: float,
+            fairway_chainages
+    ):
+        if time_step <= 0:
+            raise ValueError('Time step must be positive.')
+        self.time_step = float(time_step)
+        self.chainages = np.unique(np.concatenate((
+            [logger.distance_from_sea for logger in logger_points],
+            [np.min(fairway_chainages), np.max(fairway_chainages)]
+        )))
+        trace_times = [
+            logger.logger_times for logger in logger_points
+            if len(logger.logger_times)
+        ]
+        self.start_time = min(
+            (float(times[0]) for times in trace_times),
+            default=0.0
+        )
+        end_time = max(
+            (float(times[-1]) for times in trace_times),
+            default=0.0
+        )
+        step_number = int(
+            np.ceil((end_time - self.start_time) / self.time_step)
+        ) + 1
+        self.elevations = np.full((step_number, len(self.chainages)), np.nan)
+        self.working_logger_masks = np.zeros(step_number, dtype=np.uint64)
+        for first_step in range(0, step_number, TABLE_BUILD_STEPS):
+            steps = slice(first_step, first_step + TABLE_BUILD_STEPS)
+            (
+                self.elevations[steps],
+                self.working_logger_masks[steps]
+            ) = get_grid_water_elevations(
+                logger_points,
+                self.start_time + self.time_step * np.arange(
+                    first_step,
+                    min(first_step + TABLE_BUILD_STEPS, step_number)
+                ),
+                self.chainages
+            )
+        self.max_error, self.checked_point_number = self.get_max_error(
+            logger_points
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.elevations.nbytes + self.working_logger_masks.nbytes
+
+    def look_up(
+            self,
+            timestamps: np.ndarray,
+            distances_from_sea: np.ndarray,
+            working_logger_masks: np.ndarray
+    ) -> tuple:
+        """Return bilinear water elevations and a mask of points
+        that can be looked up in the table."""
+        if len(self.elevations) < 2 or len(self.chainages) < 2:
+            return (
+                np.full(len(timestamps), np.nan),
+                np.zeros(len(timestamps), dtype=bool)
+            )
+        step_positions = (timestamps - self.start_time) / self.time_step
+        with np.errstate(invalid='ignore'):
+            steps = np.floor(step_positions).astype(np.int64)
+        is_inside = (steps >= 0) & (steps < len(self.elevations) - 1)
+        steps = np.clip(steps, 0, max(len(self.elevations) - 2, 0))
+        time_weights = step_positions - steps
+        is_found = is_inside & (
+            self.working_logger_masks[steps] == working_logger_masks
+        ) & (
+            self.working_logger_masks[steps + 1] == working_logger_masks
+        )
+        # the edge segments extend the surface beyond the fairway ends
+        chainage_indexes = np.clip(
+            np.searchsorted(
+                self.chainages,
+                distances_from_sea,
+                side='right'
+            ) - 1,
+            0,
+            len(self.chainages) - 2
+        )
+        chainage_weights = (
+            distances_from_sea - self.chainages[chainage_indexes]
+        ) / (
+            self.chainages[chainage_indexes + 1]
+            - self.chainages[chainage_indexes]
+        )
+        earlier_levels = (
+            self.elevations[steps, chainage_indexes] * (1 - chainage_weights)
+            + self.elevations[steps, chainage_indexes + 1] * chainage_weights
+        )
+        later_levels = (
+            self.elevations[steps + 1, chainage_indexes]
+            * (1 - chainage_weights)
+            + self.elevations[steps + 1, chainage_indexes + 1]
+            * chainage_weights
+        )
+        water_levels = (
+            earlier_levels * (1 - time_weights) + later_levels * time_weights
+        )
+        # e.g. two loggers at one chainage give no finite elevations
+        is_found &= np.isfinite(water_levels)
+        return water_levels, is_found
+
+    def get_max_error(self, logger_points: list) -> tuple:
+        """Compare looked up water elevations with exact ones.
+
+        Between logger samples the exact water surface is linear in time,
+        so the largest error of the lookup is found at sample times.
+        Returns the maximum absolute error and the number of compared
+        points.
+        """
+        if len(self.chainages) < 2 or len(self.elevations) < 2:
+            return 0.0, 0
+        sample_times = np.unique(np.concatenate(
+            [logger.logger_times for logger in logger_points]
+        ))
+        max_error, checked_point_number = 0.0, 0
+        for first_time in range(0, len(sample_times), TABLE_BUILD_STEPS):
+            timestamps = sample_times[
+                first_time:first_time + TABLE_BUILD_STEPS
+            ]
+            exact_levels, working_logger_masks = get_grid_water_elevations(
+                logger_points,
+                timestamps,
+                self.chainages
+            )
+            looked_up_levels, is_found = self.look_up(
+                np.repeat(timestamps, len(self.chainages)),
+                np.tile(self.chainages, len(timestamps)),
+                np.repeat(working_logger_masks, len(self.chainages))
+            )
+            errors = np.abs(
+                looked_up_levels - exact_levels.ravel()
+            )[is_found & np.isfinite(exact_levels.ravel())]
+            if len(errors):
+                max_error = max(max_error, float(errors.max()))
+            checked_point_number += len(errors)
+        return max_error, checked_point_number
+
+    def get_report(self) -> str:
+        return (
+            'Water surface table: {} time steps of {:g} s, {} chainages, '
+            '{:.1f} MiB. Maximum error against the exact calculation '
+            'is {:.4f} m at {} checked points.'.format(
+                len(self.elevations),
+                self.time_step,
+                len(self.chainages),
+                self.nbytes / 2 ** 20,
+                self.max_error,
+                self.checked_point_number
+            )
+        )
+
+
+def calculate_table_water_elevations(
+        columns,
+        logger_points: list,
+        water_surface
+):
+    """Look up water elevations in the table, calculate the rest exactly.
+
+    Logger pairs and working loggers of points are found as in
+    calculate_water_elevations().
+    """
+    set_logger_pairs(columns, logger_points)
+    points = np.flatnonzero(columns.lower_logger_id >= 0)
+    water_levels, is_found = water_surface.look_up(
+        columns.timestamp[points],
+        columns.distance_from_sea[points],
+        columns.working_logger_mask[points]
+    )
+    columns.water_elevation[points[is_found]] = water_levels[is_found]
+    set_pair_water_elevations(columns, logger_points, points[~is_found])
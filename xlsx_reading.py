@@ -0,0 +1,190 @@
+"""Fast reading of the first two columns of *.xlsx worksheets.
+
+Worksheet XML is streamed straight out of the zip archive and scanned
+for cells of columns A and B, without building a cell object for every
+value. Workbooks this reader does not handle raise UnsupportedWorkbook,
+callers fall back to openpyxl for them.
+"""
+from datetime import datetime
+import posixpath
+import re
+from xml.etree import ElementTree
+import zipfile
+
+import numpy as np
+
+from points import EPOCH
+
+XML_BLOCK_SIZE = 1 << 20
+MAIN_NAMESPACE = (
+    '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+)
+RELATIONSHIP_NAMESPACE = (
+    '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+)
+PACKAGE_RELATIONSHIP_NAMESPACE = (
+    '{http://schemas.openxmlformats.org/package/2006/relationships}'
+)
+# number cells of columns A and B as Excel, LibreOffice and openpyxl
+# write them; a cell of another layout makes the workbook unsupported
+CELL_PATTERN = re.compile(
+    rb'<c r="([AB])([0-9]+)"(?: s="[0-9]+")?(?: t="([a-zA-Z]+)")?'
+    rb'(?: s="[0-9]+")?'
+    rb'(?:/>|>(?:<f>[^<]*</f>)?(?:<v>([^<]*)</v>)?(?:<is>.*?</is>)?</c>)',
+    re.DOTALL
+)
+CELL_REFERENCE_PATTERN = re.compile(rb'<c r="[AB][0-9]')
+# the same epochs and rounding as openpyxl.utils.datetime.from_excel()
+WINDOWS_EPOCH = datetime(1899, 12, 30)
+MAC_EPOCH = datetime(1904, 1, 1)
+MILLISECONDS_PER_DAY = 86400 * 1000
+
+
+class UnsupportedWorkbook(ValueError):
+    pass
+
+
+def get_workbook_sheets(xlsx_zip) -> tuple:
+    """Return names and archive paths of worksheets in workbook order
+    and whether dates are counted from 1904."""
+    workbook = ElementTree.fromstring(xlsx_zip.read('xl/workbook.xml'))
+    relationships = ElementTree.fromstring(
+        xlsx_zip.read('xl/_rels/workbook.xml.rels')
+    )
+    targets = {
+        relationship.get('Id'): relationship.get('Target')
+        for relationship in relationships.iter(
+            PACKAGE_RELATIONSHIP_NAMESPACE + 'Relationship'
+        )
+    }
+    sheets = []
+    for sheet in workbook.iter(MAIN_NAMESPACE + 'sheet'):
+        target = targets[sheet.get(RELATIONSHIP_NAMESPACE + 'id')]
+        if target.startswith('/'):
+            sheet_path = target[1:]
+        else:
+            sheet_path = posixpath.normpath(posixpath.join('xl', target))
+        sheets.append((sheet.get('name'), sheet_path))
+    workbook_properties = workbook.find(MAIN_NAMESPACE + 'workbookPr')
+    is_date1904 = workbook_properties is not None and (
+        workbook_properties.get('date1904') in ('1', 'true')
+    )
+    return sheets, is_date1904
+
+
+def iter_row_blocks(xml_file, block_size: int = XML_BLOCK_SIZE):
+    """Yield blocks of worksheet XML holding whole rows."""
+    remainder = b''
+    while True:
+        block = xml_file.read(block_size)
+        if not block:
+            yield remainder
+            return
+        block = remainder + block
+        block_end = block.rfind(b'</row>')
+        if block_end < 0:
+            remainder = block
+            continue
+        block_end += len(b'</row>')
+        yield block[:block_end]
+        remainder = block[block_end:]
+
+
+def read_sheet_columns(xml_file) -> tuple:
+    """Read values of columns A and B from the second row on.
+
+    Reading stops at the first row without a value in column A, as
+    openpyxl's iter_rows() loop does. Returns float arrays of columns
+    A and B, empty cells of column B are NaN.
+    """
+    column_a_blocks, column_b_blocks = [], []
+    next_row = 2
+    for block in iter_row_blocks(xml_file):
+        cells = CELL_PATTERN.findall(block)
+        if len(cells) != len(CELL_REFERENCE_PATTERN.findall(block)) or (
+                block.count(b'<c ') + block.count(b'<c>')
+                != block.count(b'<c r="')
+        ):
+            raise UnsupportedWorkbook(
+                'Cells of this layout are not supported.'
+            )
+        if not cells:
+            continue
+        columns, rows, cell_types, values = (
+            np.array(cell_column) for cell_column in zip(*cells)
+        )
+        rows = rows.astype(np.int64)
+        is_data = rows >= 2
+        column_a_indexes = np.flatnonzero(is_data & (columns == b'A'))
+        # a missing row or cell is an empty one
+        expected_rows = next_row + np.arange(len(column_a_indexes))
+        is_empty = (rows[column_a_indexes] != expected_rows) | (
+            values[column_a_indexes] == b''
+        )
+        is_finished = is_empty.any()
+        if is_finished:
+            column_a_indexes = column_a_indexes[:np.argmax(is_empty)]
+        next_row += len(column_a_indexes)
+        # a text in column A ends the trace here, openpyxl would read it
+        if np.any(
+                is_data & (rows <= next_row)
+                & (cell_types != b'') & (cell_types != b'n')
+        ):
+            raise UnsupportedWorkbook('Only number cells are supported.')
+        is_data &= (rows < next_row) & (values != b'')
+        column_a_blocks.append(values[column_a_indexes].astype(np.float64))
+        column_b_indexes = np.flatnonzero(is_data & (columns == b'B'))
+        column_b_blocks.append((
+            rows[column_b_indexes],
+            values[column_b_indexes].astype(np.float64)
+        ))
+        if is_finished:
+            break
+    column_a = np.concatenate(column_a_blocks + [np.empty(0)])
+    column_b = np.full(len(column_a), np.nan)
+    for rows, values in column_b_blocks:
+        column_b[rows - 2] = values
+    return column_a, column_b
+
+
+def get_excel_timestamps(serials: np.ndarray, is_date1904: bool):
+    """Convert Excel date serials to seconds since the epoch.
+
+    Serials are rounded to milliseconds as openpyxl does, so timestamps
+    are the same as those of datetimes read by openpyxl.
+    """
+    if np.any((serials >= 0) & (serials < 1)):
+        raise UnsupportedWorkbook('Times without dates are not supported.')
+    days, day_fractions = np.divmod(serials, 1)
+    milliseconds = np.round(day_fractions * 86400 * 1000)
+    if is_date1904:
+        epoch = MAC_EPOCH
+    else:
+        epoch = WINDOWS_EPOCH
+        # serials before 1900-03-01 count the nonexistent 1900-02-29
+        days += (serials > 0) & (serials < 60)
+    epoch_days = (epoch - EPOCH).days
+    microseconds = (
+        (days.astype(np.int64) + epoch_days) * MILLISECONDS_PER_DAY
+        + milliseconds.astype(np.int64)
+    ) * 1000
+    return microseconds / 10 ** 6
+
+
+def read_logger_workbook(xlsx_file_name: str) -> dict:
+    """Return timestamps and elevations of every worksheet by its name.
+
+    Timestamps come from Excel date serials in column A, elevations
+    from column B, the first row is a header. Rows are in file order.
+    """
+    with zipfile.ZipFile(xlsx_file_name) as xlsx_zip:
+        sheets, is_date1904 = get_workbook_sheets(xlsx_zip)
+        sheet_columns = {}
+        for sheet_name, sheet_path in sheets:
+            with xlsx_zip.open(sheet_path) as xml_file:
+                serials, elevations = read_sheet_columns(xml_file)
+            sheet_columns[sheet_name] = (
+                get_excel_timestamps(serials, is_date1904),
+                elevations
+            )
+    return sheet_columns